@@ -0,0 +1,212 @@
+####################################################################################################
+# In-process caches. LRUCache is a bounded, thread-safe LRU cache with per-entry expiry, and       #
+# MetadataCache keeps one LRUCache per MongoDB collection so hot metadata lookups are a dict       #
+# access instead of a network round trip. SingleFlight coalesces concurrent loads of one key.      #
+####################################################################################################
+import threading
+import time
+from collections import OrderedDict
+
+from Config.ConfigManager import ConfigManager
+
+# Returned by LRUCache.get() when the key is not cached, so that None can be cached as a value
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded LRU cache where every entry expires after a time to live
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        """
+        :param max_size: Maximum number of entries, the least recently used entry is evicted beyond this
+        :param ttl: Seconds an entry stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        """
+        Get a cached value, marking it as recently used
+
+        :param key: Cache key
+        :param default: Returned if the key is not cached or has expired
+        :return: Cached value or default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None) -> None:
+        """
+        Cache a value, evicting the least recently used entries if the cache is full
+
+        :param key: Cache key
+        :param value: Value to cache
+        :param ttl: Seconds the entry stays valid, defaults to the cache's ttl
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def keys(self) -> list:
+        """
+        :return: Cached keys, most recently used first
+        """
+        with self._lock:
+            return list(reversed(self._data))
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        :return: Size and hit/miss/eviction counters
+        """
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class MetadataCache:
+    """
+    One LRUCache per MongoDB collection, sized and timed from the [CACHE] config section.
+
+    [CACHE] MAX_SIZE and TTL are the defaults, <collection name>_TTL overrides the TTL of a collection
+    """
+
+    def __init__(self):
+        config = ConfigManager().get_config()
+        self._config = config
+        self.max_size = config.getint('CACHE', 'MAX_SIZE', fallback=2048)
+        self.ttl = config.getint('CACHE', 'TTL', fallback=300)
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def collection(self, collection_name: str) -> LRUCache:
+        """
+        Get the cache of a collection, creating it on first use
+        """
+        with self._lock:
+            cache = self._caches.get(collection_name)
+            if cache is None:
+                ttl = self._config.getint('CACHE', f'{collection_name}_TTL', fallback=self.ttl)
+                cache = LRUCache(self.max_size, ttl)
+                self._caches[collection_name] = cache
+            return cache
+
+    def get(self, collection_name: str, key, default=MISSING):
+        return self.collection(collection_name).get(key, default)
+
+    def set(self, collection_name: str, key, value, ttl: float = None) -> None:
+        self.collection(collection_name).set(key, value, ttl)
+
+    def invalidate(self, collection_name: str, key=None) -> None:
+        """
+        Drop one key of a collection, or the whole collection if key is None or can't be hashed
+        """
+        with self._lock:
+            cache = self._caches.get(collection_name)
+        if cache is None:
+            return
+
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+
+        if key is None:
+            cache.clear()
+        else:
+            cache.invalidate(key)
+
+    def stats(self) -> dict:
+        """
+        :return: Counters for every collection cache
+        """
+        with self._lock:
+            caches = dict(self._caches)
+        return {name: cache.stats() for name, cache in caches.items()}
+
+
+class SingleFlight:
+    """
+    Runs one load per key at a time, callers asking for a key that is already loading wait for that load
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, function):
+        """
+        Call function(), or wait for the call already running for the key and share its result
+
+        :param key: Key being loaded
+        :param function: Loads the key
+        :return: Result of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
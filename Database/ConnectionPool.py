@@ -0,0 +1,247 @@
+####################################################################################################
+# This class is a thread-safe pool of MariaDB connections. Subclasses supply the configuration     #
+# section and how a single connection is created, the pool handles checkout, return, health checks #
+# and closing connections that have been idle for too long. A connection can also be held for the  #
+# whole of a request, so that several calls share one transaction.                                 #
+####################################################################################################
+import configparser
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mariadb
+
+
+class ConnectionPool:
+    """
+    Base class for a pool of database connections, one pool per subclass
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Configuration section of the database, e.g. DBMS_MOVIE
+    section = None
+
+    def __new__(cls) -> object:
+        """
+        Create the pool if it doesn't exist, otherwise return the existing pool
+        """
+        with cls._instance_lock:
+            if not cls._instance:
+                instance = super().__new__(cls)
+                instance._init_pool()
+                cls._instance = instance
+        return cls._instance
+
+    def _init_pool(self) -> None:
+        """
+        Read the pool configuration and open the minimum number of connections
+        """
+        from Config.ConfigManager import ConfigManager
+
+        config = ConfigManager().get_config()
+
+        try:
+            self.min_size = config.getint(self.section, 'POOL_MIN_SIZE', fallback=2)
+            self.max_size = config.getint(self.section, 'POOL_MAX_SIZE', fallback=10)
+            self.idle_timeout = config.getint(self.section, 'POOL_IDLE_TIMEOUT', fallback=300)
+            self.checkout_timeout = config.getint(self.section, 'POOL_CHECKOUT_TIMEOUT', fallback=30)
+        except (configparser.Error, ValueError) as e:
+            logging.error(f"Error reading pool configuration for [{self.section}]: {e}")
+            raise e
+
+        if self.max_size < 1 or self.min_size > self.max_size:
+            raise ValueError(f"[{self.section}] POOL_MIN_SIZE must be between 0 and POOL_MAX_SIZE")
+
+        # Idle connections as (connection, returned_at), most recently returned on the right
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        # Connection held by the current thread for the duration of a request
+        self._local = threading.local()
+
+        for _ in range(self.min_size):
+            self._idle.append((self._create_connection(), time.monotonic()))
+            self._size += 1
+
+        logging.info(f"[{self.section}] Connection pool ready: min={self.min_size}, max={self.max_size}")
+
+    def _create_connection(self) -> mariadb.Connection:
+        """
+        Create a single connection to the database, implemented by the subclass
+
+        :return: A connection to the database
+        :rtype: mariadb.Connection
+        """
+        raise NotImplementedError
+
+    def acquire(self) -> mariadb.Connection:
+        """
+        Check out a connection, blocking until one is free if the pool is at its maximum size
+
+        :return: A connection to the database
+        :rtype: mariadb.Connection
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+
+        with self._condition:
+            self._close_idle()
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.error(f"[{self.section}] Timed out waiting for a pooled connection")
+                    raise mariadb.PoolError(f"[{self.section}] No connection available in the pool")
+                self._condition.wait(remaining)
+
+            if self._idle:
+                connection, _ = self._idle.pop()
+            else:
+                connection = None
+                self._size += 1
+
+        if connection is None:
+            try:
+                return self._create_connection()
+            except Exception:
+                self._discard()
+                raise
+
+        # The server may have dropped the connection while it was idle
+        try:
+            connection.ping()
+        except mariadb.Error:
+            logging.info(f"[{self.section}] Replacing a stale pooled connection")
+            self._close_quietly(connection)
+            try:
+                connection = self._create_connection()
+            except Exception:
+                self._discard()
+                raise
+
+        return connection
+
+    def release(self, connection: mariadb.Connection) -> None:
+        """
+        Return a connection to the pool, ending any transaction left open on it
+
+        :param connection: Connection previously checked out with acquire()
+        :return: None
+        """
+        try:
+            connection.rollback()
+        except mariadb.Error as e:
+            logging.warning(f"[{self.section}] Dropping a broken pooled connection: {e}")
+            self._close_quietly(connection)
+            self._discard()
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of a with block
+
+        :return: A connection to the database
+        :rtype: mariadb.Connection
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    @contextmanager
+    def cursor(self):
+        """
+        Check out a connection and open a cursor on it for the duration of a with block
+
+        :return: A cursor on a pooled connection
+        :rtype: mariadb.Cursor
+        """
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def request_connection(self) -> mariadb.Connection:
+        """
+        Get the connection held by the current request, checking one out on first use.
+        It stays checked out until release_request_connection() is called.
+
+        :return: A connection to the database
+        :rtype: mariadb.Connection
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self.acquire()
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def request_cursor(self):
+        """
+        Open a cursor on the current request's connection for the duration of a with block
+
+        :return: A cursor on the request's connection
+        :rtype: mariadb.Cursor
+        """
+        cursor = self.request_connection().cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def release_request_connection(self) -> None:
+        """
+        Return the current request's connection to the pool, rolling back anything not committed
+        :return: None
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            self.release(connection)
+
+    def _discard(self) -> None:
+        """
+        Forget a connection that was closed or never opened, freeing its slot
+        """
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close_idle(self) -> None:
+        """
+        Close connections idle for longer than idle_timeout, keeping at least min_size open.
+        Must be called with the condition held.
+        """
+        now = time.monotonic()
+        # Oldest connections are on the left
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            connection, _ = self._idle.popleft()
+            self._close_quietly(connection)
+            self._size -= 1
+
+    @staticmethod
+    def _close_quietly(connection: mariadb.Connection) -> None:
+        try:
+            connection.close()
+        except mariadb.Error:
+            pass
+
+    def close_connection(self) -> None:
+        """
+        Close every idle connection in the pool
+        :return: None
+        """
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._close_quietly(connection)
+                self._size -= 1
@@ -2,8 +2,10 @@
 # These are the functions for the Actor page.                                                      #
 ####################################################################################################
 import mariadb
+import requests
 import tmdbsimple as tmdb
-from .DB_Connect import DBConnection
+from .DB_Connect import DBConnectionPool
+from .Movie import find_metadata, tmdb_not_found
 from Config.ConfigManager import ConfigManager
 import Database.Mongo as Mongo
 import logging
@@ -14,9 +16,8 @@ config_manager = ConfigManager()
 # Get the configuration
 config = config_manager.get_config()
 
-# DBMS_Movie DB Connection
-connection = DBConnection().connection
-cursor = connection.cursor()
+# DBMS_Movie DB Connection Pool
+pool = DBConnectionPool()
 
 # MongoDB Connection
 handler = Mongo.MongoDBHandler.get_instance(
@@ -71,8 +72,9 @@ def Actor(actor_name: str = None, actor_tmdb_id: str = None, order_by=None) -> d
     stmt += f"ORDER BY {orders[order_by[0]]} {order_by[1]}"
 
     try:
-        cursor.execute(stmt, (actor_name or actor_tmdb_id,))
-        movies = cursor.fetchall()
+        with pool.cursor() as cursor:
+            cursor.execute(stmt, (actor_name or actor_tmdb_id,))
+            movies = cursor.fetchall()
     except mariadb.Error as e:
         logging.error(f"Error getting actor's movies: {e}")
 
@@ -86,8 +88,9 @@ def Actor(actor_name: str = None, actor_tmdb_id: str = None, order_by=None) -> d
                "FROM Actor " \
                "WHERE tmdb_id = ?"
         try:
-            cursor.execute(stmt, (actor_tmdb_id,))
-            actor_name = cursor.fetchone()[0]
+            with pool.cursor() as cursor:
+                cursor.execute(stmt, (actor_tmdb_id,))
+                actor_name = cursor.fetchone()[0]
         except mariadb.Error as e:
             logging.error(f"Error getting actor's name: {e}")
 
@@ -98,8 +101,9 @@ def Actor(actor_name: str = None, actor_tmdb_id: str = None, order_by=None) -> d
                "FROM Actor " \
                "WHERE actor_name = ?"
         try:
-            cursor.execute(stmt, (actor_name,))
-            actor_tmdb_id = cursor.fetchone()[0]
+            with pool.cursor() as cursor:
+                cursor.execute(stmt, (actor_name,))
+                actor_tmdb_id = cursor.fetchone()[0]
         except [mariadb.Error, TypeError] as e:
             logging.error(f"Error getting actor's tmdb_id: {e}")
 
@@ -120,26 +124,23 @@ def get_actor_info(actor_tmdb_id: int, actor_name: str = None) -> dict:
     :return: Actor's info
     :rtype: dict
     """
-    data = handler.find_documents(
-        config.get('MONGODB', 'ACTOR_INFO_COLLECTION'),
-        {"_id": actor_tmdb_id}
-    )
-    if data is None or data == []:
-        if actor_tmdb_id:
-            try:
-                data = tmdb.People(actor_tmdb_id).info()
-            except Exception as e:
-                logging.error(f"Error getting actor's info from tmdb: {e}")
-                data = None
-            if data:
-                handler.insert_document(
-                    config.get('MONGODB', 'ACTOR_INFO_COLLECTION'),
-                    {"_id": actor_tmdb_id, "data": data}
-                )
-        elif actor_name:
-            data = tmdb.Search().person(query=actor_name)["results"]
-        else:
-            data = None
-    else:
-        data = data[0]["data"]
-    return data
+    if not actor_tmdb_id:
+        if actor_name:
+            return tmdb.Search().person(query=actor_name)["results"]
+        return None
+
+    def fetch():
+        try:
+            return {"data": tmdb.People(actor_tmdb_id).info()}
+        except requests.exceptions.HTTPError as e:
+            # Only a 404 is cached as a negative entry, other errors are counted and nothing is cached
+            if not tmdb_not_found(e):
+                raise e
+            logging.error(f"Error getting actor's info from tmdb: {e}")
+            return None
+
+    # Served from the cache (refreshed in the background once stale), fetched from tmdb if not cached
+    data = find_metadata(config.get('MONGODB', 'ACTOR_INFO_COLLECTION'), {"_id": actor_tmdb_id}, fetch)
+    if not data or data[0].get("not_found"):
+        return None
+    return data[0]["data"]
@@ -1,6 +1,13 @@
 import mariadb
+import requests
 import tmdbsimple as tmdb
-from .DB_Connect import DBConnection
+from .DB_Connect import DBConnectionPool
+from .Events import catalog_changed
+from .Ingest import ingest_movies
+from .Similarity import build_similarities
+from .ReviewStats import rebuild_review_stats
+from .Movie import new_movie, tmdb_not_found, _fetch_movie_info
+from Database.Jobs import job_queue, PermanentJobError
 from Config.ConfigManager import ConfigManager
 import Database.Mongo as Mongo
 import logging
@@ -13,8 +20,7 @@ config = config_manager.get_config()
 
 tmdb.API_KEY = config.get('TMDB', 'API_KEY')
 
-connection = DBConnection().connection
-cursor = connection.cursor()
+pool = DBConnectionPool()
 
 handler = Mongo.MongoDBHandler.get_instance(
     config.get('MONGODB', 'CONNECTION_STRING'),
@@ -26,31 +32,36 @@ def updateMovie(movie_name: str = None, release_date: str = None, synopsis: str
     if not all([movie_name, release_date, synopsis, movie_id]):
         return False
 
-    try:
-        with connection.cursor() as cursor:
-            # Begin the transaction
-            connection.begin()
-            logging.info(f"Updating movie details for movie_id: {movie_id}")
+    with pool.connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                # Begin the transaction
+                connection.begin()
+                logging.info(f"Updating movie details for movie_id: {movie_id}")
+
+                cursor.execute("SELECT title FROM Movie WHERE movie_id = ?", (movie_id,))
+                old_title = cursor.fetchone()
 
-            # Update the movie details
-            update_stmt = "UPDATE Movie " \
-                          "SET title = ?, release_date = ?, synopsis = ? " \
-                          "WHERE movie_id = ?"
+                # Update the movie details
+                update_stmt = "UPDATE Movie " \
+                              "SET title = ?, release_date = ?, synopsis = ? " \
+                              "WHERE movie_id = ?"
 
-            cursor.execute(update_stmt, (movie_name, release_date, synopsis, movie_id))
+                cursor.execute(update_stmt, (movie_name, release_date, synopsis, movie_id))
 
-            # Commit the transaction
-            connection.commit()
+                # Commit the transaction
+                connection.commit()
 
-            logging.info(f"Successfully updated movie details for movie_id: {movie_id}")
+                logging.info(f"Successfully updated movie details for movie_id: {movie_id}")
+                catalog_changed("update", int(movie_id), old_title[0] if old_title else None)
 
-            return True
+                return True
 
-    except mariadb.Error as e:
-        # print(f"[-] Error updating movie details from database\n {e}")
-        logging.error(f"Error updating movie details from database\n {e}")
-        # Rollback the transaction in case of an error
-        connection.rollback()
+        except mariadb.Error as e:
+            # print(f"[-] Error updating movie details from database\n {e}")
+            logging.error(f"Error updating movie details from database\n {e}")
+            # Rollback the transaction in case of an error
+            connection.rollback()
 
     return False
 
@@ -59,27 +70,32 @@ def deleteMovie(movie_id: str = None) -> bool:
     if not movie_id:
         return False
 
-    try:
-        with connection.cursor() as cursor:
-            # Begin the transaction
-            connection.begin()
-            logging.info(f"Deleting movie from database with movie_id: {movie_id}")
+    with pool.connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                # Begin the transaction
+                connection.begin()
+                logging.info(f"Deleting movie from database with movie_id: {movie_id}")
 
-            # Delete from parent table
-            parent_delete_stmt = "DELETE FROM Movie WHERE movie_id = ?"
-            cursor.execute(parent_delete_stmt, (movie_id,))
+                cursor.execute("SELECT title FROM Movie WHERE movie_id = ?", (movie_id,))
+                title = cursor.fetchone()
 
-            # Commit the transaction
-            connection.commit()
+                # Delete from parent table
+                parent_delete_stmt = "DELETE FROM Movie WHERE movie_id = ?"
+                cursor.execute(parent_delete_stmt, (movie_id,))
 
-            logging.info(f"Successfully deleted movie from database with movie_id: {movie_id}")
+                # Commit the transaction
+                connection.commit()
 
-            return True
+                logging.info(f"Successfully deleted movie from database with movie_id: {movie_id}")
+                catalog_changed("delete", int(movie_id), title[0] if title else None)
 
-    except mariadb.Error as e:
-        logging.error(f"Error deleting movie from database\n {e}")
-        # Rollback the transaction in case of an error
-        connection.rollback()
+                return True
+
+        except mariadb.Error as e:
+            logging.error(f"Error deleting movie from database\n {e}")
+            # Rollback the transaction in case of an error
+            connection.rollback()
 
     return False
 
@@ -92,55 +108,52 @@ def update_movie_info(title: str = None, tmdb_id: int = None) -> bool:
     :type title: str
     :param tmdb_id: tmdb_id of the movie
     :type tmdb_id: int
-    :return: True if successful, False otherwise
+    :return: True if successful, False otherwise (retried as a job)
+    :raises PermanentJobError: If the movie isn't in the database or on TMDB, retrying won't help
     """
-    poster_link = config.get('MOVIE', 'TMDB_IMAGE_URL')
-    data = handler.find_documents(config.get('MONGODB', 'MOVIE_INFO_COLLECTION'), {'title': title})
-    new_poster = None
-    new_banner = None
-    new_rating = None
-    movie_info = None
+    collection = config.get('MONGODB', 'MOVIE_INFO_COLLECTION')
+
+    # Prefer the TMDB id stored with the movie over searching by title
+    if title and not tmdb_id:
+        with pool.cursor() as cursor:
+            cursor.execute("SELECT tmdb_id FROM Movie WHERE title = ? AND tmdb_id IS NOT NULL", (title,))
+            row = cursor.fetchone()
+        if row is not None:
+            tmdb_id = row[0]
+    elif tmdb_id and not title:
+        with pool.cursor() as cursor:
+            cursor.execute("SELECT title FROM Movie WHERE tmdb_id = ?", (tmdb_id,))
+            row = cursor.fetchone()
+        if row is None:
+            logging.error(f"No movie with tmdb_id {tmdb_id} in the database")
+            raise PermanentJobError(f"No movie with tmdb_id {tmdb_id} in the database")
+        title = row[0]
+
+    if not title:
+        raise PermanentJobError("No title or tmdb_id provided")
 
     try:
-        if title:
-            logging.info(f"Retrieving movie info from tmdb for title: {title}")
-            movie_id = tmdb.Search().movie(query=title)['results'][0]['id']
-            movie_info = tmdb.Movies(movie_id).info()
-        elif tmdb_id:
-            logging.info(f"Retrieving movie info from tmdb for tmdb_id: {tmdb_id}")
-            movie_info = tmdb.Movies(tmdb_id).info()
-
-        # Update the movie info in the database if the data does not match
-        if movie_info is not None:
-            if movie_info['poster_path'] is not None:
-                new_poster = poster_link + movie_info['poster_path']
-            else:
-                new_poster = None
-            if movie_info['backdrop_path'] is not None:
-                new_banner = poster_link + movie_info['backdrop_path']
-            else:
-                new_banner = None
-            try:
-                new_rating = [movie_info['vote_average'], movie_info['vote_count']]
-            except KeyError:
-                new_rating = None
-
-    except IndexError:
+        logging.info(f"Retrieving movie info from tmdb for {title} ({tmdb_id})")
+        movie_info = _fetch_movie_info(title, tmdb_id, raise_errors=True)
+    except (IndexError, requests.exceptions.HTTPError) as e:
+        if isinstance(e, IndexError) or tmdb_not_found(e):
+            raise PermanentJobError(f"Movie {title} not found on TMDB")
         print(f"[-] Error retrieving movie info from tmdb\n")
         return False
-
-    try:
-        if data[0]['poster'] != new_poster:
-            handler.update_document(config.get('MONGODB', 'MOVIE_INFO_COLLECTION'), {'title': title},
-                                    {'poster': new_poster}, '$pull')
-        if data[0]['banner'] != new_banner:
-            handler.update_document(config.get('MONGODB', 'MOVIE_INFO_COLLECTION'), {'title': title},
-                                    {'banner': new_banner}, '$pull')
-        if data[0]['rating'] != new_rating:
-            handler.update_document(config.get('MONGODB', 'MOVIE_INFO_COLLECTION'), {'title': title},
-                                    {'rating': new_rating}, '$pull')
-    except IndexError:
-        logging.error(f"Error retrieving movie info from tmdb for title: {title}")
+    except TypeError:
+        print(f"[-] Error retrieving movie info from tmdb\n")
         return False
 
+    # Replace the cached document (creating it if missing), this also drops the in-process copy
+    handler.upsert_documents(collection, [({'title': title}, movie_info)])
+    catalog_changed("refresh", title=title)
+
     return True
+
+
+# Long catalog operations run as background jobs, see routes/Admin.py
+job_queue.register("new_movie", new_movie)
+job_queue.register("update_movie_info", update_movie_info)
+job_queue.register("import_movies", ingest_movies)
+job_queue.register("build_similarities", build_similarities)
+job_queue.register("rebuild_review_stats", rebuild_review_stats)
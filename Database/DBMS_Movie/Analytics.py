@@ -0,0 +1,91 @@
+####################################################################################################
+# Review analytics computed by MongoDB aggregation pipelines.                                     #
+# Ratings are unwound, converted to numbers and grouped in the database, so only the summaries     #
+# (average, count, distribution, totals) cross the network instead of every review's arrays.       #
+# Genres live in MariaDB, per-genre totals are per-movie totals folded with one genre query.       #
+####################################################################################################
+import threading
+
+from .Movie import config, handler, get_genre_names
+
+REVIEW_COLLECTION = config.get('MONGODB', 'REVIEW_COLLECTION')
+
+_indexed = False
+_index_lock = threading.Lock()
+
+# Ratings are stored as submitted by the form, strings that may be empty when only a comment was posted
+_UNWIND_SCORES = [
+    {'$unwind': '$ratings'},
+    {'$project': {'movie_id': 1,
+                  'score': {'$convert': {'input': '$ratings', 'to': 'int', 'onError': None, 'onNull': None}}}},
+    {'$match': {'score': {'$ne': None}}},
+]
+
+
+def _ensure_indexes() -> None:
+    global _indexed
+    with _index_lock:
+        if not _indexed:
+            # Every pipeline starts with a $match on the movie
+            handler.create_index(REVIEW_COLLECTION, 'movie_id')
+            _indexed = True
+
+
+def movie_rating_summary(movie_id: int) -> dict:
+    """
+    Rating summary of a movie
+    :param movie_id: Movie ID
+    :return: {average, count, total, distribution: {score: number of ratings}}, average is 0 without ratings
+    """
+    _ensure_indexes()
+    pipeline = [
+        {'$match': {'movie_id': movie_id}},
+        *_UNWIND_SCORES,
+        {'$group': {'_id': '$score', 'count': {'$sum': 1}}},
+    ]
+    distribution = {row['_id']: row['count'] for row in handler.aggregate(REVIEW_COLLECTION, pipeline) or []}
+
+    count = sum(distribution.values())
+    total = sum(score * number for score, number in distribution.items())
+    return {
+        'average': total / count if count else 0,
+        'count': count,
+        'total': total,
+        'distribution': dict(sorted(distribution.items())),
+    }
+
+
+def movie_rating_totals(movie_ids: list[int] = None) -> dict[int, dict]:
+    """
+    Rating totals of many movies with one pipeline
+    :param movie_ids: Movie IDs, None for every reviewed movie
+    :return: Dictionary of movie_id to {average, count, total}, movies without ratings are left out
+    """
+    _ensure_indexes()
+    pipeline = [{'$match': {'movie_id': {'$in': list(movie_ids)}}}] if movie_ids is not None else []
+    pipeline += [
+        {'$match': {'movie_id': {'$ne': None}}},
+        *_UNWIND_SCORES,
+        {'$group': {'_id': '$movie_id', 'average': {'$avg': '$score'}, 'count': {'$sum': 1},
+                    'total': {'$sum': '$score'}}},
+    ]
+    return {int(row['_id']): {'average': row['average'], 'count': row['count'], 'total': row['total']}
+            for row in handler.aggregate(REVIEW_COLLECTION, pipeline) or []}
+
+
+def genre_rating_totals() -> dict[str, dict]:
+    """
+    Rating totals per genre, a movie counts towards its first genre like on the admin dashboard
+    :return: Dictionary of genre name to {count, total}, highest total first
+    """
+    movies = movie_rating_totals()
+    genres = get_genre_names(list(movies))
+
+    totals = {}
+    for movie_id, movie in movies.items():
+        if not genres.get(movie_id):
+            continue
+        genre = totals.setdefault(genres[movie_id][0], {'count': 0, 'total': 0})
+        genre['count'] += movie['count']
+        genre['total'] += movie['total']
+    return dict(sorted(totals.items(), key=lambda item: item[1]['total'], reverse=True))
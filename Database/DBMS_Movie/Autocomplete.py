@@ -0,0 +1,29 @@
+####################################################################################################
+# Typeahead suggestions for the search bar. Served from the prefix arrays of the in-process search #
+# indexes (see SearchIndex.py), which are loaded at startup and updated on every catalog write.    #
+####################################################################################################
+from .SearchIndex import catalog_search
+
+
+def suggest(prefix: str, limit: int = 10) -> list[dict]:
+    """
+    Movie titles, actor names and director names matching what has been typed so far
+    :param prefix: Text typed so far
+    :param limit: Maximum number of suggestions
+    :return: List of suggestions {type, name, id, tmdb_id} (and year for movies), best matches first
+    """
+    # Never block a keystroke on the first build, there are just no suggestions until it's done
+    if not catalog_search.ready(0):
+        return []
+
+    matches = []
+    for rank, movie in catalog_search.movies.complete(prefix, limit):
+        matches.append((rank, {'type': 'movie', 'name': movie[1], 'id': movie[0], 'tmdb_id': movie[4],
+                               'year': movie[2].year if movie[2] else None}))
+    for rank, actor in catalog_search.actors.complete(prefix, limit):
+        matches.append((rank, {'type': 'actor', 'name': actor[1], 'id': actor[0], 'tmdb_id': actor[2]}))
+    for rank, director in catalog_search.directors.complete(prefix, limit):
+        matches.append((rank, {'type': 'director', 'name': director[1], 'id': director[0], 'tmdb_id': director[2]}))
+
+    matches.sort(key=lambda match: match[0])
+    return [suggestion for _, suggestion in matches[:limit]]
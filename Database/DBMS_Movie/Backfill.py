@@ -0,0 +1,114 @@
+####################################################################################################
+# One-off job to fill in Movie.tmdb_id for movies added before the column existed.                 #
+# Ids already known to the MongoDB movie_info cache are reused, the rest are searched on TMDB      #
+# through the shared executor and written back with one executemany per batch.                    #
+# Run from the project root: python -m Database.DBMS_Movie.Backfill                                #
+####################################################################################################
+import argparse
+import logging
+
+import requests
+import tmdbsimple as tmdb
+
+from .Movie import config, executor, handler, pool
+
+
+def resolve_tmdb_id(title: str, release_date=None) -> int | None:
+    """
+    Search TMDB for a movie, narrowed down to its release year when known
+
+    :param title: Movie title
+    :param release_date: Movie release date
+    :return: TMDB id of the best match, None if not found
+    """
+    params = {'query': title}
+    if release_date is not None:
+        params['year'] = release_date.year
+
+    try:
+        results = tmdb.Search().movie(**params)['results']
+        # Fall back to searching without the year, release dates in our data are not always exact
+        if not results and 'year' in params:
+            results = tmdb.Search().movie(query=title)['results']
+    except requests.exceptions.HTTPError as e:
+        logging.error(f"Error searching TMDB for {title}: {e}")
+        return None
+
+    if not results:
+        return None
+
+    # Prefer an exact title match over TMDB's popularity ranking
+    for result in results:
+        if result.get('title', '').lower() == title.lower():
+            return result['id']
+    return results[0]['id']
+
+
+def backfill_tmdb_ids(batch_size: int = 100) -> int:
+    """
+    Fill in Movie.tmdb_id where it is NULL
+
+    :param batch_size: Number of movies resolved and written per batch
+    :return: Number of movies updated
+    """
+    collection = config.get('MONGODB', 'MOVIE_INFO_COLLECTION')
+
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT movie_id, title, release_date FROM Movie WHERE tmdb_id IS NULL ORDER BY movie_id")
+        movies = cursor.fetchall()
+
+    print(f"[+] {len(movies)} movies without a TMDB id")
+    updated = 0
+
+    for start in range(0, len(movies), batch_size):
+        batch = movies[start:start + batch_size]
+        titles = [movie[1] for movie in batch]
+
+        # Ids the metadata cache already resolved
+        cached = handler.find_documents(collection, {'title': {'$in': titles}, 'tmdb_id': {'$ne': None}}, 0) or []
+        known = {movie_info['title']: movie_info['tmdb_id'] for movie_info in cached}
+
+        unknown = [movie for movie in batch if movie[1] not in known]
+        resolved = executor.map(resolve_tmdb_id, [movie[1] for movie in unknown], [movie[2] for movie in unknown],
+                                upstream='tmdb')
+        for movie, tmdb_id in zip(unknown, resolved):
+            if tmdb_id is not None:
+                known[movie[1]] = tmdb_id
+
+        rows = [(known[movie[1]], movie[0]) for movie in batch if movie[1] in known]
+        if rows:
+            with pool.connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.executemany("UPDATE Movie SET tmdb_id = ? WHERE movie_id = ?", rows)
+                connection.commit()
+
+            # Cached "not found on TMDB" entries for these titles are now wrong, let them be fetched by id
+            handler.delete_documents(collection, {'title': {'$in': [movie[1] for movie in batch if movie[1] in known]},
+                                                  'tmdb_id': None}, many=True)
+
+        updated += len(rows)
+        logging.info(f"Backfilled TMDB ids for {len(rows)}/{len(batch)} movies")
+        print(f"[+] {start + len(batch)}/{len(movies)} processed, {updated} updated")
+
+    return updated
+
+
+def parse_args() -> None:
+    """
+    Parse command line arguments
+    -b, --batch-size: Number of movies resolved and written per batch
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Fill in TMDB ids for movies that don't have one yet.",
+        prog="python -m Database.DBMS_Movie.Backfill"
+    )
+
+    parser.add_argument("-b", "--batch-size", type=int, default=100, help="Movies per batch (default: 100)")
+
+    args = parser.parse_args()
+    backfill_tmdb_ids(batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    parse_args()
@@ -0,0 +1,116 @@
+####################################################################################################
+# These are the functions for the home page carousel.                                              #
+# Candidates (movies within a year of today that have a banner) are kept in memory and refreshed   #
+# by a background thread, so a page view only samples from a list.                                 #
+####################################################################################################
+
+import logging
+import random
+import threading
+
+from .Events import on_catalog_change
+from .Movie import config, pool, get_movie_info_batch
+
+
+class CarouselPool:
+    """
+    Background-refreshed pool of carousel candidates (title, release_date, banner)
+    """
+
+    def __init__(self, refresh_interval: int = 900, warmup_timeout: float = 2):
+        """
+        :param refresh_interval: Seconds between refreshes
+        :param warmup_timeout: Seconds a request waits for the first refresh before rendering without a carousel
+        """
+        self.refresh_interval = refresh_interval
+        self.warmup_timeout = warmup_timeout
+        self._candidates = []
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def refresh(self) -> None:
+        """
+        Reload the candidates from the database and the movie info cache
+        """
+        stmt = "SELECT title, release_date, tmdb_id " \
+               "FROM Movie " \
+               "WHERE release_date " \
+               "BETWEEN CURRENT_DATE() - INTERVAL 1 YEAR " \
+               "AND CURRENT_DATE() + INTERVAL 1 YEAR;"
+
+        with pool.cursor() as cursor:
+            cursor.execute(stmt)
+            movies = cursor.fetchall()
+
+        movie_info = get_movie_info_batch([movie[0] for movie in movies], {movie[0]: movie[2] for movie in movies})
+        default_banner = config.get('MOVIE', 'DEFAULT_BANNER_URL')
+
+        candidates = []
+        for movie in movies:
+            banner = movie_info[movie[0]][2]
+            if banner and banner != default_banner:
+                candidates.append((movie[0], movie[1].strftime("%d %B %Y"), banner))
+
+        with self._lock:
+            self._candidates = candidates
+        self._ready.set()
+        logging.info(f"Carousel pool refreshed with {len(candidates)} movies")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Error refreshing carousel pool: {e}")
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """
+        Start the background refresh thread if it isn't running
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="carousel-pool", daemon=True)
+                self._thread.start()
+
+    def invalidate(self) -> None:
+        """
+        Refresh as soon as possible, e.g. after the catalog changed
+        """
+        self._wake.set()
+
+    def sample(self, k: int) -> list[tuple]:
+        """
+        Pick k random candidates
+
+        :param k: Number of movies
+        :return: List of movies (title, release_date, banner)
+        """
+        self.start()
+        self._ready.wait(self.warmup_timeout)
+        with self._lock:
+            candidates = self._candidates
+        return random.sample(candidates, min(k, len(candidates)))
+
+
+carousel_pool = CarouselPool(
+    refresh_interval=config.getint('MOVIE', 'CAROUSEL_REFRESH_INTERVAL', fallback=900)
+)
+
+
+@on_catalog_change
+def _refresh_carousel(action: str, movie_id: int = None, title: str = None) -> None:
+    carousel_pool.invalidate()
+
+
+def carousel() -> list[tuple]:
+    """
+    Returns a list of 5 to 7 movies that are within 1 year of the current date and have a banner image
+    :return: List of movies (title, release_date, banner)
+    :rtype: list[tuple]
+    """
+    desired_length = random.randint(5, 7)  # Randomly choose the number of movies to select
+    return carousel_pool.sample(desired_length)
@@ -5,11 +5,13 @@
 import logging
 
 import mariadb
+import requests
 import tmdbsimple as tmdb
 
 import Database.Mongo as Mongo
 from Config.ConfigManager import ConfigManager
-from .DB_Connect import DBConnection
+from .DB_Connect import DBConnectionPool
+from .Movie import find_metadata, tmdb_not_found
 
 # Initialize the config manager
 config_manager = ConfigManager()
@@ -17,8 +19,7 @@ config_manager = ConfigManager()
 # Get the configuration
 config = config_manager.get_config()
 
-connection = DBConnection().connection
-cursor = connection.cursor()
+pool = DBConnectionPool()
 
 # MongoDB Connection
 handler = Mongo.MongoDBHandler.get_instance(
@@ -78,8 +79,9 @@ def Director(
     stmt += f"ORDER BY {orders[order_by[0]]} {order_by[1]}"
 
     try:
-        cursor.execute(stmt, params)
-        movies = cursor.fetchall()
+        with pool.cursor() as cursor:
+            cursor.execute(stmt, params)
+            movies = cursor.fetchall()
     except mariadb.Error as e:
         logging.error(f"Error executing SQL statement: {e}")
         return {"movies": [], "director": None}
@@ -95,8 +97,9 @@ def Director(
         # Fetch director tmdb_ids in a single query
         stmt = "SELECT director_name, tmdb_id FROM Director WHERE director_name = ?"
         try:
-            cursor.execute(stmt, (director_name,))
-            director_rows = cursor.fetchall()
+            with pool.cursor() as cursor:
+                cursor.execute(stmt, (director_name,))
+                director_rows = cursor.fetchall()
             director_dict = {row[0]: row[1] for row in director_rows}
             if director_name in director_dict:
                 director_tmdb_id = director_dict[director_name]
@@ -116,21 +119,21 @@ def get_director_info(director_tmdb_id: int) -> dict:
     :return: Director's info
     :rtype: dict
     """
-    data = handler.find_documents(
-        config.get('MONGODB', 'DIRECTOR_INFO_COLLECTION'),
-        {"_id": director_tmdb_id}
-    )
-
-    if not data or data == []:
+    def fetch():
         try:
-            data = tmdb.People(director_tmdb_id).info()
-            handler.insert_document(
-                config.get('MONGODB', 'DIRECTOR_INFO_COLLECTION'),
-                {"_id": director_tmdb_id, "data": data}
-            )
+            return {"data": tmdb.People(director_tmdb_id).info()}
         except IndexError:
-            data = None
-    else:
-        data = data[0]["data"]
-
-    return data
+            # Not on tmdb, cached as a negative entry
+            return None
+        except requests.exceptions.HTTPError as e:
+            # Only a 404 is cached as a negative entry, other errors are counted and nothing is cached
+            if not tmdb_not_found(e):
+                raise e
+            return None
+
+    # Served from the cache (refreshed in the background once stale), fetched from tmdb if not cached
+    data = find_metadata(config.get('MONGODB', 'DIRECTOR_INFO_COLLECTION'), {"_id": director_tmdb_id}, fetch)
+    if not data or data[0].get("not_found"):
+        return None
+
+    return data[0]["data"]
@@ -0,0 +1,40 @@
+####################################################################################################
+# Catalog change notifications. Caches and indexes built from the Movie tables register a hook     #
+# with on_catalog_change(), and the functions that write to the catalog call catalog_changed()     #
+# after committing.                                                                                #
+####################################################################################################
+import logging
+
+_catalog_hooks = []
+
+
+def on_catalog_change(callback):
+    """
+    Register a function to be called after every catalog write. Can be used as a decorator.
+
+    The callback is called as callback(action, movie_id, title) where action is one of
+    "insert", "update" or "delete", and title is the movie's title (before the change for "update").
+    Action "refresh" means the movie's TMDB metadata was refreshed, its rows in the catalog did not change.
+    movie_id and title are None when several movies changed at once, e.g. a bulk import.
+
+    :param callback: Function to call
+    :return: The callback
+    """
+    _catalog_hooks.append(callback)
+    return callback
+
+
+def catalog_changed(action: str, movie_id: int = None, title: str = None) -> None:
+    """
+    Notify every registered hook of a catalog write. A failing hook is logged and does not stop the others.
+
+    :param action: "insert", "update", "delete" or "refresh"
+    :param movie_id: Id of the movie that changed
+    :param title: Title of the movie that changed
+    :return: None
+    """
+    for callback in list(_catalog_hooks):
+        try:
+            callback(action, movie_id, title)
+        except Exception as e:
+            logging.error(f"Error in catalog hook {getattr(callback, '__name__', callback)}: {e}")
@@ -0,0 +1,225 @@
+####################################################################################################
+# Bulk import of movies from TMDB.                                                                 #
+# Details and credits of every movie are fetched with one request per movie, concurrently on the   #
+# shared executor's tmdb_bulk upstream and under a rate limit. Each batch is then written in one   #
+# transaction: genres, actors and directors are upserted by natural key with one executemany per   #
+# table, and the movies and their links are inserted with executemany.                             #
+# Run from the project root: python -m Database.DBMS_Movie.Ingest movies.txt                       #
+####################################################################################################
+import argparse
+import logging
+
+import mariadb
+import requests
+import tmdbsimple as tmdb
+
+from Database.Cache import MISSING
+from Database.Executor import RateLimiter
+from .Events import catalog_changed
+from .Movie import config, executor, pool, tmdb_not_found, upsert_genres, upsert_actors, upsert_directors
+
+# Shared by every import, so concurrent imports together stay under the TMDB rate limit
+rate_limiter = RateLimiter(config.getint('TMDB', 'RATE_LIMIT', fallback=40))
+
+
+def fetch_movie(reference: int | str) -> dict | None:
+    """
+    Fetch a movie's details and credits from TMDB
+    :param reference: TMDB id, or title to search for
+    :return: TMDB movie details with a "credits" key, None if not found, MISSING if TMDB couldn't be reached
+             (connection errors, timeouts, 429, 5xx)
+    """
+    try:
+        if isinstance(reference, str):
+            rate_limiter.wait()
+            results = tmdb.Search().movie(query=reference)['results']
+            if not results:
+                logging.warning(f"Movie {reference} not found on TMDB.")
+                return None
+            reference = results[0]['id']
+
+        rate_limiter.wait()
+        return tmdb.Movies(reference).info(append_to_response='credits')
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Error fetching movie {reference} from TMDB: {e}")
+        # One unreachable movie must not abort the import, it is reported as failed
+        return None if tmdb_not_found(e) else MISSING
+
+
+def _placeholders(values) -> str:
+    return ",".join(["?"] * len(values))
+
+
+def _write_batch(movies: list[dict]) -> list[dict]:
+    """
+    Insert a batch of fetched movies in one transaction, skipping movies already in the database
+    :param movies: TMDB movie details with credits
+    :return: The movies that were inserted
+    """
+    # e.g. every fetch of the batch failed, IN () is not valid SQL
+    if not movies:
+        return []
+
+    with pool.connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                connection.begin()
+
+                # Movies already in the catalog, by TMDB id or title
+                tmdb_ids = [movie['id'] for movie in movies]
+                titles = [movie['title'] for movie in movies]
+                cursor.execute(f"SELECT tmdb_id, title FROM Movie "
+                               f"WHERE tmdb_id IN ({_placeholders(tmdb_ids)}) OR title IN ({_placeholders(titles)})",
+                               (*tmdb_ids, *titles))
+                existing = cursor.fetchall()
+                existing_ids = {row[0] for row in existing}
+                existing_titles = {row[1].lower() for row in existing}
+                movies = [movie for movie in movies
+                          if movie['id'] not in existing_ids and movie['title'].lower() not in existing_titles]
+                if not movies:
+                    connection.rollback()
+                    return []
+
+                genres, actors, directors = [], {}, {}
+                for movie in movies:
+                    for genre in movie.get('genres', []):
+                        genres.append(genre['name'])
+                    for cast in movie['credits'].get('cast', []):
+                        actors[str(cast['id'])] = (cast['name'], str(cast['id']))
+                    for crew in movie['credits'].get('crew', []):
+                        if crew.get('job') == 'Director':
+                            directors[str(crew['id'])] = (crew['name'], str(crew['id']))
+
+                genre_ids = upsert_genres(genres, cursor)
+                actor_ids = upsert_actors(list(actors.values()), cursor)
+                director_ids = upsert_directors(list(directors.values()), cursor)
+
+                cursor.executemany("INSERT INTO Movie (title, release_date, synopsis, tmdb_id) VALUES (?, ?, ?, ?)",
+                                   [(movie['title'], movie.get('release_date') or None, movie.get('overview') or '',
+                                     movie['id']) for movie in movies])
+                tmdb_ids = [movie['id'] for movie in movies]
+                cursor.execute(f"SELECT tmdb_id, movie_id FROM Movie WHERE tmdb_id IN ({_placeholders(tmdb_ids)})",
+                               tmdb_ids)
+                movie_ids = dict(cursor.fetchall())
+
+                movie_genres, movie_actors, movie_directors = [], [], []
+                for movie in movies:
+                    movie_id = movie_ids[movie['id']]
+                    for genre in movie.get('genres', []):
+                        movie_genres.append((movie_id, genre_ids[genre['name']]))
+
+                    cast_ids = set()
+                    for billing_order, cast in enumerate(movie['credits'].get('cast', [])):
+                        # An actor playing several roles is listed once, with the first role
+                        if cast['id'] in cast_ids:
+                            continue
+                        cast_ids.add(cast['id'])
+                        movie_actors.append((movie_id, actor_ids[str(cast['id'])], str(cast['character']),
+                                             billing_order))
+
+                    # Like new_movie, only the first director is recorded
+                    for crew in movie['credits'].get('crew', []):
+                        if crew.get('job') == 'Director':
+                            movie_directors.append((movie_id, director_ids[str(crew['id'])]))
+                            break
+
+                if movie_genres:
+                    cursor.executemany("INSERT INTO Movie_Genre (movie_id, genre_id) VALUES (?, ?)", movie_genres)
+                if movie_actors:
+                    cursor.executemany("INSERT INTO Movie_Actor (movie_id, actor_id, movie_character, billing_order) "
+                                       "VALUES (?, ?, ?, ?)", movie_actors)
+                if movie_directors:
+                    cursor.executemany("INSERT INTO Movie_Director (movie_id, director_id) VALUES (?, ?)",
+                                       movie_directors)
+
+                connection.commit()
+                return movies
+        except mariadb.Error as e:
+            logging.error(f"Error importing movies into the database\n {e}")
+            connection.rollback()
+            raise e
+
+
+def ingest_movies(references: list[int | str], batch_size: int = 50) -> dict:
+    """
+    Import movies from TMDB
+
+    :param references: TMDB ids (int) or titles (str)
+    :param batch_size: Movies fetched and written per transaction
+    :return: Summary {added: [titles], existing: count, not_found: [references], failed: [references]},
+             movies without a release date count as not found
+    """
+    summary = {'added': [], 'existing': 0, 'not_found': [], 'failed': []}
+    references = list(dict.fromkeys(references))
+
+    for start in range(0, len(references), batch_size):
+        batch = references[start:start + batch_size]
+        # Waiting for the rate limiter holds a tmdb_bulk slot, never one of the slots serving page requests
+        fetched = executor.map(fetch_movie, batch, upstream='tmdb_bulk')
+
+        movies = {}
+        # References written by this batch, failed if the transaction fails
+        found = []
+        for reference, movie in zip(batch, fetched):
+            if movie is MISSING:
+                summary['failed'].append(reference)
+            elif movie is None or not movie.get('release_date'):
+                summary['not_found'].append(reference)
+            elif movie['id'] in movies:
+                summary['existing'] += 1
+            else:
+                movies[movie['id']] = movie
+                found.append(reference)
+
+        try:
+            added = _write_batch(list(movies.values()))
+        except mariadb.Error:
+            summary['failed'].extend(found)
+            continue
+
+        summary['added'].extend(movie['title'] for movie in added)
+        summary['existing'] += len(movies) - len(added)
+        logging.info(f"Imported {len(added)}/{len(batch)} movies")
+        if added:
+            # One notification for the whole batch, the listeners rebuild instead of updating movie by movie
+            catalog_changed("insert")
+
+    return summary
+
+
+def parse_reference(line: str) -> int | str | None:
+    """
+    A line of an import list is a TMDB id if it is a number, otherwise a title
+    """
+    line = line.strip()
+    if not line:
+        return None
+    return int(line) if line.isdigit() else line
+
+
+def parse_args() -> None:
+    """
+    Parse command line arguments
+    file: File with one TMDB id or title per line
+    -b, --batch-size: Movies fetched and written per transaction
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Import movies from TMDB by id or title.",
+        prog="python -m Database.DBMS_Movie.Ingest"
+    )
+
+    parser.add_argument("file", type=argparse.FileType('r'), help="File with one TMDB id or title per line")
+    parser.add_argument("-b", "--batch-size", type=int, default=50, help="Movies per transaction (default: 50)")
+
+    args = parser.parse_args()
+    references = [reference for reference in map(parse_reference, args.file) if reference is not None]
+    summary = ingest_movies(references, batch_size=args.batch_size)
+    print(f"[+] Added {len(summary['added'])}, already in the database {summary['existing']}, "
+          f"not found {len(summary['not_found'])}, failed {len(summary['failed'])}")
+    for reference in summary['not_found']:
+        print(f"[-] Not found: {reference}")
+
+
+if __name__ == "__main__":
+    parse_args()
@@ -4,9 +4,11 @@
 # The functions are organized by page.                                                             #
 ####################################################################################################
 
-import concurrent.futures
+import datetime
+import json
 import logging
-import random
+import math
+import threading
 from collections import Counter
 from typing import Optional, Any
 
@@ -16,7 +18,11 @@ import tmdbsimple as tmdb
 
 import Database.Mongo as Mongo
 from Config.ConfigManager import ConfigManager
-from .DB_Connect import DBConnection
+from Database.Cache import LRUCache, MISSING, SingleFlight
+from Database.Executor import ExecutorService
+from Database.Jobs import PermanentJobError
+from .DB_Connect import DBConnectionPool
+from .Events import on_catalog_change, catalog_changed
 
 # Initialize the config manager
 config_manager = ConfigManager()
@@ -26,60 +32,181 @@ config = config_manager.get_config()
 
 tmdb.API_KEY = config.get('TMDB', 'API_KEY')
 
-connection = DBConnection().connection
-cursor = connection.cursor()
+pool = DBConnectionPool()
+
+# Shared thread pool for TMDB and MongoDB fan-out
+executor = ExecutorService()
+
+# Concurrent TMDB fetches of one cached document share a single request, every flight runs _store_metadata
+# so all callers get the stored document, or None on errors
+metadata_flight = SingleFlight()
+# Seconds after which a cached TMDB document is served stale and refreshed in the background
+STALE_AFTER = config.getint('CACHE', 'STALE_AFTER', fallback=86400)
+# Same for negative entries (titles and people TMDB doesn't know), they are re-checked sooner
+NEGATIVE_TTL = config.getint('CACHE', 'NEGATIVE_TTL', fallback=3600)
+
+# Keys with a background refresh submitted and not finished yet, so a backed up tmdb queue doesn't collect one
+# refresh per stale read of the same key
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+# Per collection counters of the cached TMDB lookups, see metadata_stats()
+_metadata_stats = {}
+_metadata_stats_lock = threading.Lock()
 
 handler = Mongo.MongoDBHandler.get_instance(
     config.get('MONGODB', 'CONNECTION_STRING'),
     config.get('MONGODB', 'DATABASE')
 )
 
+# Number of movies of each listing, for the page count
+page_counts = LRUCache(max_size=256, ttl=config.getint('MOVIE', 'PAGE_COUNT_TTL', fallback=600))
+
+# The Genre table (genre_id -> name), it is tiny and only grows when movies are added
+genre_table = LRUCache(max_size=1, ttl=config.getint('MOVIE', 'GENRE_CACHE_TTL', fallback=3600))
+
+# Listings are ordered newest first, movie_id breaks ties so every movie has a unique position
+HOME_WHERE = "WHERE release_date < CURRENT_DATE() "
+GENRE_WHERE = "WHERE Genre.name = ? AND release_date <> '2045-05-31' "
+GENRE_JOIN = "INNER JOIN Movie_Genre " \
+             "ON Movie.movie_id = Movie_Genre.movie_id " \
+             "INNER JOIN Genre " \
+             "ON Movie_Genre.genre_id = Genre.genre_id "
+KEYSET_AFTER = "AND (Movie.release_date < ? OR (Movie.release_date = ? AND Movie.movie_id < ?)) "
+KEYSET_ORDER = "ORDER BY Movie.release_date DESC, Movie.movie_id DESC "
+
 
-def Movie_list(page: int = 1, limit: int = 30) -> list[tuple]:
+@on_catalog_change
+def _clear_page_counts(action: str, movie_id: int = None, title: str = None) -> None:
+    if action != "refresh":
+        page_counts.clear()
+        genre_table.clear()
+
+
+def _movie_count(genre: str = None) -> int:
+    """
+    Number of movies in the home listing, or in a genre listing, cached for [MOVIE] PAGE_COUNT_TTL seconds
+    or until the catalog changes
+    :param genre: Genre name, None for the home listing
+    :return: Number of movies
+    """
+    count = page_counts.get(genre)
+    if count is not MISSING:
+        return count
+
+    if genre is None:
+        stmt = "SELECT COUNT(*) FROM Movie " + HOME_WHERE
+        params = ()
+    else:
+        stmt = "SELECT COUNT(*) FROM Movie " + GENRE_JOIN + GENRE_WHERE
+        params = (genre,)
+
+    with pool.cursor() as cursor:
+        cursor.execute(stmt, params)
+        count = cursor.fetchone()[0]
+
+    page_counts.set(genre, count)
+    return count
+
+
+def _seek(stmt: str, params: tuple, page: int, limit: int, after: tuple = None) -> list[tuple]:
+    """
+    Read one page of a listing ordered by KEYSET_ORDER, whose last two columns are (release_date, movie_id)
+
+    With the key of the last movie already shown the page is one index seek, without it (a page opened by its
+    number) the previous pages are skipped with OFFSET.
+    """
+    if after is not None:
+        stmt += KEYSET_AFTER + KEYSET_ORDER + "LIMIT ?;"
+        params = (*params, after[0], after[0], after[1], limit)
+    else:
+        stmt += KEYSET_ORDER + "LIMIT ? OFFSET ?;"
+        params = (*params, limit, (max(page, 1) - 1) * limit)
+
+    with pool.cursor() as cursor:
+        cursor.execute(stmt, params)
+        return cursor.fetchall()
+
+
+def page_cursor(movies: list[tuple], limit: int = 30) -> str | None:
+    """
+    Cursor of the next page, passed back as `after` to read it with one index seek
+    :param movies: Rows of the current page, ending with (release_date, movie_id)
+    :param limit: Number of movies per page
+    :return: "release_date_movieid" of the last movie, None if this is the last page
+    """
+    if len(movies) < limit:
+        return None
+    release_date, movie_id = movies[-1][-2:]
+    return f"{release_date.isoformat()}_{movie_id}"
+
+
+def parse_page_cursor(cursor: str = None) -> tuple | None:
+    """
+    :param cursor: Cursor from page_cursor()
+    :return: Key (release_date, movie_id), None if missing or malformed
+    """
+    try:
+        release_date, movie_id = cursor.split('_')
+        return datetime.date.fromisoformat(release_date), int(movie_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _listing_page(movies: list[tuple]) -> list[tuple]:
+    """
+    Format the rows (title, synopsis, tmdb_id, release_date, movie_id) of a listing page
+    :return: List of movies (title, release_date, synopsis, poster_link, banner_link)
+    """
+    result = []
+
+    # Resolve the whole page in one batch
+    movie_info = get_movie_info_batch([movie[0] for movie in movies], {movie[0]: movie[2] for movie in movies})
+
+    for movie in movies:
+        tmdb_id, poster, banner, rating = movie_info[movie[0]]
+        movie_title = movie[0] + " (" + movie[3].strftime("%Y") + ")"
+        movie_date = movie[3].strftime("%d %B %Y")
+        synopsis = movie[1][:100] + "..."
+        result.append((movie_title, movie_date, synopsis, poster, banner))
+
+    return result
+
+
+def movie_listing(page: int = 1, limit: int = 30, after: tuple = None) -> tuple[list[tuple], str | None]:
+    """
+    Get a page of the home listing and the cursor of the next page
+
+    Pages are read with keyset pagination on (release_date, movie_id): given the cursor of the previous page,
+    the page costs one index seek instead of skipping over all previous pages.
+
+    :param page: Page number (For Frontend), used when after is None
+    :param limit: Number of movies per page
+    :param after: Key (release_date, movie_id) of the last movie already shown, see parse_page_cursor()
+    :return: List of movies (title, release_date, synopsis, poster_link, banner_link), next page cursor
+    """
+    stmt = "SELECT title, synopsis, tmdb_id, release_date, movie_id " \
+           "FROM Movie " + HOME_WHERE
+    movies = _seek(stmt, (), page, limit, after)
+    return _listing_page(movies), page_cursor(movies, limit)
+
+
+def Movie_list(page: int = 1, limit: int = 30, after: tuple = None) -> list[tuple]:
     """
     Get all movies in the database, for the home page (30 most recent)
 
-    Used to show movies on the home page.
+    Used to show movies on the home page, see movie_listing() for the cursor of the next page.
 
     :param page: Page number (For Frontend)
     :type page: int
     :param limit: Number of movies per page
     :type limit: int
+    :param after: Key (release_date, movie_id) of the last movie already shown, page is used if None
+    :type after: tuple
     :return: List of movies (title, release_date, synopsis, poster_link, banner_link)
     :rtype: list[tuple]
     """
-    result = []
-    offset = (page - 1) * limit
-
-    stmt = "SELECT title, release_date, synopsis " \
-           "FROM Movie " \
-           "WHERE release_date < CURRENT_DATE() " \
-           "ORDER BY release_date DESC " \
-           "LIMIT ? " \
-           "OFFSET ?;"
-    cursor.execute(stmt, (limit, offset))
-    movies = cursor.fetchall()
-
-    # Helper function to get movie info concurrently
-    def get_movie_info_concurrent(movie):
-        tmdb_id, poster, banner, rating = get_movie_info(movie[0])
-        if poster is None:
-            poster = config.get("MOVIE", "DEFAULT_POSTER_URL")
-        if banner is None:
-            banner = config.get("MOVIE", "DEFAULT_BANNER_URL")
-        movie_title = movie[0] + " (" + movie[1].strftime("%Y") + ")"
-        movie_date = movie[1].strftime("%d %B %Y")
-        synopsis = movie[2][:100] + "..."
-        return (movie_title, movie_date, synopsis, poster, banner)
-
-    # Execute get_movie_info concurrently
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        movie_info_results = executor.map(get_movie_info_concurrent, movies)
-
-    # Collect the results
-    result = list(movie_info_results)
-
-    return result
+    return movie_listing(page, limit, after)[0]
 
 
 def movie_page(title: str) -> dict | None:
@@ -88,15 +215,16 @@ def movie_page(title: str) -> dict | None:
 
     result: {
             "title": str, "release_date": str, "synopsis": str, "movie_id": int,
-            "director": {"director_name": str, "tmdb_id": int},
-            "actors": [(name: str, tmdb_id: int, character: str), ...],
-            "genres": [genre: str, ...],
+            "director": (director_name: str, tmdb_id: int) or None,
+            "actors": [(name: str, tmdb_id: int, character: str), ...] in billing order,
+            "genres": [genre: str, ...] sorted by name,
             "movie": (title: str, release_date: str, synopsis: str, poster: str, banner: str, movie_id: int),
             "rating": [rating: float, count: int],
             "tmdb_link": str
             }
 
-    Used for the movie page to display all the information about a movie
+    Used for the movie page to display all the information about a movie. The director, cast and genres are
+    aggregated per movie by the database, so this is one round trip returning one row.
 
     :param title: Movie title
     :return: Movie dictionary
@@ -104,37 +232,43 @@ def movie_page(title: str) -> dict | None:
     """
     result = {}
 
-    movie_query = "SELECT Movie.title, Movie.release_date, Movie.synopsis, Movie.movie_id, " \
-                  "Director.director_name, Director.tmdb_id, " \
-                  "Actor.actor_name, Actor.tmdb_id, Movie_Actor.movie_character, " \
-                  "Genre.name " \
-                  "FROM Movie " \
-                  "JOIN Movie_Director ON Movie.movie_id = Movie_Director.movie_id " \
+    # Cast is ordered by billing_order, movies added before it was recorded fall back to insertion order
+    movie_query = "SELECT Movie.title, Movie.release_date, Movie.synopsis, Movie.movie_id, Movie.tmdb_id, " \
+                  "(SELECT JSON_ARRAY(Director.director_name, Director.tmdb_id) " \
+                  "FROM Movie_Director " \
                   "JOIN Director ON Movie_Director.director_id = Director.director_id " \
-                  "JOIN Movie_Actor ON Movie.movie_id = Movie_Actor.movie_id " \
+                  "WHERE Movie_Director.movie_id = Movie.movie_id " \
+                  "ORDER BY Director.director_id " \
+                  "LIMIT 1), " \
+                  "(SELECT JSON_ARRAYAGG(JSON_ARRAY(Actor.actor_name, Actor.tmdb_id, Movie_Actor.movie_character) " \
+                  "ORDER BY Movie_Actor.billing_order, Actor.actor_id) " \
+                  "FROM Movie_Actor " \
                   "JOIN Actor ON Movie_Actor.actor_id = Actor.actor_id " \
-                  "JOIN Movie_Genre ON Movie.movie_id = Movie_Genre.movie_id " \
+                  "WHERE Movie_Actor.movie_id = Movie.movie_id), " \
+                  "(SELECT JSON_ARRAYAGG(Genre.name ORDER BY Genre.name) " \
+                  "FROM Movie_Genre " \
                   "JOIN Genre ON Movie_Genre.genre_id = Genre.genre_id " \
-                  "WHERE Movie.title = ?"
+                  "WHERE Movie_Genre.movie_id = Movie.movie_id) " \
+                  "FROM Movie " \
+                  "WHERE Movie.title = ? " \
+                  "LIMIT 1"
 
     try:
-        cursor.execute(movie_query, (title,))
-        rows = cursor.fetchall()
+        with pool.cursor() as cursor:
+            cursor.execute(movie_query, (title,))
+            movie = cursor.fetchone()
 
-        if rows:
-            movie = rows[0]
+        if movie:
             movie_date = movie[1].strftime("%d %B %Y")
-            movie_id, poster, banner, rating = get_movie_info(movie[0])
+            movie_id, poster, banner, rating = get_movie_info(movie[0], movie[4])
 
             result["movie"] = (movie[0], movie_date, movie[2], poster, banner, movie[3])
             result["rating"] = rating
-            result["director"] = (movie[4], movie[5])
 
-            genres = {row[9] for row in rows}
-            result["genres"] = list(genres)
-
-            actors = {(row[6], row[7], row[8]) for row in rows}
-            result["actors"] = list(actors)
+            director = json.loads(movie[5]) if movie[5] else None
+            result["director"] = tuple(director) if director else None
+            result["actors"] = [tuple(actor) for actor in json.loads(movie[6] or "[]")]
+            result["genres"] = json.loads(movie[7] or "[]")
 
             result["tmdb_link"] = config.get("MOVIE", "TMDB_MOVIE_URL") + str(movie_id)
         else:
@@ -155,132 +289,52 @@ def get_pages(pages: int = 1, limit: int = 30) -> dict[str, int]:
     :return: total_pages, pages_left
     :rtype: dict[str, int]
     """
-    stmt = "SELECT ceil(count(*) / ?), ceil(count(*) / ?) - ? " \
-           "FROM Movie " \
-           "WHERE release_date < CURRENT_DATE();"
-
-    cursor.execute(stmt, (limit, limit, pages))
-    total_pages, pages_left = cursor.fetchone()
-    return {"total_pages": total_pages, "pages_left": pages_left}
+    total_pages = math.ceil(_movie_count() / limit)
+    return {"total_pages": total_pages, "pages_left": total_pages - pages}
 
 
-def carousel() -> list[tuple]:
+def genre_listing(genre: str, page: int = 1, limit: int = 30, after: tuple = None) -> tuple[list[tuple], str | None]:
     """
-    Returns a list of 5 movies that are within 1 year of the current date and have a banner image
-    :return: List of movies (title, release_date, banner)
-    :rtype: list[tuple]
+    Get a page of a genre listing and the cursor of the next page, paged the same way as movie_listing
+    :param genre: Genre name
+    :param page: Page number (For Frontend), used when after is None
+    :param limit: Number of movies per page
+    :param after: Key (release_date, movie_id) of the last movie already shown, see parse_page_cursor()
+    :return: List of movies (title, release_date, synopsis, poster_link, banner_link), next page cursor
     """
-    result = []
-    desired_length = random.randint(5, 7)  # Randomly choose the number of movies to select
-
-    stmt = "SELECT title, release_date " \
-           "FROM Movie " \
-           "WHERE release_date " \
-           "BETWEEN CURRENT_DATE() - INTERVAL 1 YEAR " \
-           "AND CURRENT_DATE() + INTERVAL 1 YEAR " \
-           "ORDER BY RAND() " \
-           "LIMIT ?;"
-
-    cursor.execute(stmt, (desired_length,))
-    movies = cursor.fetchall()
-
-    # Helper function to get banner image concurrently
-    def get_banner_concurrent(movie):
-        banner = get_movie_info(movie[0])[2]
-        if banner is not None:
-            movie_date = movie[1].strftime("%d %B %Y")
-            return movie[0], movie_date, banner
-        else:
-            return None
-
-    # Execute get_banner_concurrent concurrently
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        banner_results = executor.map(get_banner_concurrent, movies)
-
-    # Collect the results
-    for banner_result in banner_results:
-        if banner_result is not None:
-            result.append(banner_result)
-        if len(result) == desired_length:
-            break
-
-    return result
+    stmt = "SELECT Movie.title, Movie.synopsis, Movie.tmdb_id, Movie.release_date, Movie.movie_id " \
+           "FROM Movie " + GENRE_JOIN + GENRE_WHERE
+    movies = _seek(stmt, (genre,), page, limit, after)
+    return _listing_page(movies), page_cursor(movies, limit)
 
 
-def Genre(genre: str = None, page: int = 1, limit: int = 30) -> list[tuple]:
+def Genre(genre: str = None, page: int = 1, limit: int = 30, after: tuple = None) -> list[tuple]:
     """
-    Returns a list of Movies based on the genre
+    Returns a list of Movies based on the genre, paged the same way as Movie_list
+    :param after: Key (release_date, movie_id) of the last movie already shown, page is used if None
     :return: List of genres (genre_id, name)
     :return: List of movies (title, release_date, poster)
     :rtype: list[tuple]
     """
     if genre is None:
-        stmt = "SELECT genre_id, name " \
-               "FROM Genre;"
-        cursor.execute(stmt)
-        result = cursor.fetchall()
+        return get_all_genres()
+    return genre_listing(genre, page, limit, after)[0]
 
-    else:
-        stmt = "SELECT * " \
-               "FROM Movie " \
-               "INNER JOIN Movie_Genre " \
-               "ON Movie.movie_id = Movie_Genre.movie_id " \
-               "INNER JOIN Genre " \
-               "ON Movie_Genre.genre_id = Genre.genre_id " \
-               "WHERE Genre.name = ? " \
-               "AND release_date <> '2045-05-31' " \
-               "ORDER BY Movie.release_date DESC, " \
-               "Movie.title " \
-               "LIMIT ? " \
-               "OFFSET ?;"
-        cursor.execute(stmt, (genre, limit, (page - 1) * limit))
-        movies = cursor.fetchall()
-        result = []
-
-        # Helper function to get movie info concurrently
-        def get_movie_info_concurrent(movie):
-            movie_id, poster, banner, ratings = get_movie_info(movie[1])
-            if poster is None:
-                poster = config.get("MOVIE", "DEFAULT_POSTER_URL")
-            if banner is None:
-                banner = config.get("MOVIE", "DEFAULT_BANNER_URL")
-            movie_title = movie[1] + " (" + movie[2].strftime("%Y") + ")"
-            movie_date = movie[2].strftime("%d %B %Y")
-            synopsis = movie[3][:100] + "..."
-            return movie_title, movie_date, synopsis, poster, banner
-
-        # Execute get_movie_info concurrently
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            movie_info_results = executor.map(get_movie_info_concurrent, movies)
-
-        # Collect the results
-        result = list(movie_info_results)
-
-    return result
 
-
-def get_genre_pages(genre: str, limit: int = 30) -> dict[str, int]:
+def get_genre_pages(genre: str, limit: int = 30, pages: int = 1) -> dict[str, int]:
     """
     Get the number of pages for a genre
     :param genre: Genre name
     :type genre: str
     :param limit: Number of movies per page
     :type limit: int
+    :param pages: Current page
+    :type pages: int
     :return: total_pages, pages_left
     :rtype: dict[str, int]
     """
-    stmt = "SELECT ceil(count(*) / ?), ceil(count(*) / ?) - ? " \
-           "FROM Movie " \
-           "INNER JOIN Movie_Genre " \
-           "ON Movie.movie_id = Movie_Genre.movie_id " \
-           "INNER JOIN Genre " \
-           "ON Movie_Genre.genre_id = Genre.genre_id " \
-           "WHERE Genre.name = ? " \
-           "AND release_date <> '2045-05-31';"
-
-    cursor.execute(stmt, (limit, limit, limit, genre))
-    total_pages, pages_left = cursor.fetchone()
-    return {"total_pages": total_pages, "pages_left": pages_left}
+    total_pages = math.ceil(_movie_count(genre) / limit)
+    return {"total_pages": total_pages, "pages_left": total_pages - pages}
 
 
 def get_all_genres() -> list[tuple]:
@@ -289,18 +343,28 @@ def get_all_genres() -> list[tuple]:
     :return: List of genres (genre_id, name)
     :rtype: list[tuple]
     """
-    stmt = "SELECT genre_id, name " \
-           "FROM Genre;"
+    return list(genre_names().items())
 
-    cursor.execute(stmt)
 
-    return cursor.fetchall()
+def genre_names() -> dict[int, str]:
+    """
+    The Genre table, loaded once and kept in memory for [MOVIE] GENRE_CACHE_TTL seconds or until the catalog changes
+    :return: Dictionary of genre_id to name, ordered by genre_id
+    """
+    genres = genre_table.get('genres')
+    if genres is MISSING:
+        with pool.cursor() as cursor:
+            cursor.execute("SELECT genre_id, name FROM Genre ORDER BY genre_id")
+            genres = dict(cursor.fetchall())
+        genre_table.set('genres', genres)
+    return genres
 
 
 def get_movie_by_id(id):
     stmt = "SELECT * FROM Movie WHERE movie_id = ?"
-    cursor.execute(stmt, (id,))
-    return cursor.fetchone()
+    with pool.cursor() as cursor:
+        cursor.execute(stmt, (id,))
+        return cursor.fetchone()
 
 
 def new_movie(title: Optional[str] = None, tmdb_id: Optional[int] = None) -> bool:
@@ -311,6 +375,7 @@ def new_movie(title: Optional[str] = None, tmdb_id: Optional[int] = None) -> boo
     :param tmdb_id: TMDB id of the movie
     :param title: Title of the movie
     :return: True if the movie was successfully added, False otherwise
+    :raises PermanentJobError: If the movie isn't on TMDB or neither title nor tmdb_id is given, retrying won't help
     """
 
     director = None
@@ -326,7 +391,7 @@ def new_movie(title: Optional[str] = None, tmdb_id: Optional[int] = None) -> boo
             logging.info(movie_info)
         except IndexError:
             logging.error(f"Movie {title} not found on TMDB. Please try again.")
-            return False
+            raise PermanentJobError(f"Movie {title} not found on TMDB")
     elif tmdb_id is not None:
         try:
             movie_info = tmdb.Movies(tmdb_id).info()
@@ -334,117 +399,170 @@ def new_movie(title: Optional[str] = None, tmdb_id: Optional[int] = None) -> boo
             movie_title = movie_info['title']
             movie_release_date = movie_info['release_date']
             synopsis = movie_info['overview']
-        except requests.exceptions.HTTPError:
-            logging.error(f"Movie with TMDB id {tmdb_id} not found on TMDB. Please try again.")
+        except requests.exceptions.HTTPError as e:
+            if tmdb_not_found(e):
+                logging.error(f"Movie with TMDB id {tmdb_id} not found on TMDB. Please try again.")
+                raise PermanentJobError(f"Movie with TMDB id {tmdb_id} not found on TMDB")
+            logging.error(f"Error fetching movie with TMDB id {tmdb_id} from TMDB: {e}")
+            return False
     else:
         logging.error("Invalid arguments. Please provide either 'title' or 'tmdb_id'.")
-        return False
+        raise PermanentJobError("Neither title nor tmdb_id provided")
 
-    try:
-        with connection.cursor() as cursor:
-            logging.info(f"Adding movie {movie_title} to database...")
-            # Begin the transaction
-            connection.begin()
-
-            # Get Genres
-            movie = tmdb.Movies(movie_tmdb_id)
-            genres = movie.info().get('genres', [])
-            movie_genres = [genre['name'] for genre in genres]
-
-            # Get Actors and Directors
-            url = f"https://api.themoviedb.org/3/movie/{movie_tmdb_id}/credits?language=en-US"
-            headers = {
-                "accept": "application/json",
-                "Authorization": "Bearer " + config.get("TMDB", "ACCESS_TOKEN")
-            }
-            response = requests.get(url, headers=headers)
-            cast_dict = {}
-
-            for cast in response.json().get('cast', []):
-                cast_dict[cast['name']] = [cast['id'], cast['character']]
-
-            for crew in response.json().get('crew', []):
-                if crew.get('job') == 'Director':
-                    director = crew['name']
-                    director_id = crew['id']
-                    break
-
-            # Insert director into DB if not None
-            if director is not None and director_id is not None:
-                director_stmt = "INSERT INTO Director (director_name, tmdb_id) VALUES (?, ?)"
-                cursor.execute(director_stmt, (director, director_id))
-                director_id = check_director(director)
-                logging.info(f"Director added to database. Director ID: {director_id}")
-
-            # Insert movie into DB if not exists
-            movie = check_movie(movie_title)
-            if movie is None:
-                movie_stmt = "INSERT INTO Movie (title, release_date, synopsis) VALUES (?, ?, ?)"
-                cursor.execute(movie_stmt, (movie_title, movie_release_date, synopsis))
-                movie_id = cursor.lastrowid
-                logging.info(f"Movie {movie_title} added to database. Movie ID: {movie_id}")
-
-                for genre in movie_genres:
-                    genre_id = check_genre(genre)
-                    if genre_id is None:
-                        genre_stmt = "INSERT INTO Genre (name) VALUES (?)"
-                        cursor.execute(genre_stmt, (genre,))
-                        genre_id = check_genre(genre)
-
-                    movie_genre_stmt = "INSERT INTO Movie_Genre (movie_id, genre_id) VALUES (?, ?)"
-                    cursor.execute(movie_genre_stmt, (movie_id, genre_id))
-
-                logging.info("Genres added to the database.")
-
-                for actor in cast_dict:
-                    actor_id = check_actor(actor)
-                    if actor_id is None:
-                        actor_stmt = "INSERT INTO Actor (actor_name, tmdb_id) VALUES (?, ?)"
-                        cursor.execute(actor_stmt, (actor, cast_dict[actor][0]))
-                        actor_id = check_actor(actor)
-
-                    movie_actor_stmt = "INSERT INTO Movie_Actor (movie_id, actor_id, movie_character) VALUES (?, ?, ?)"
-                    cursor.execute(movie_actor_stmt, (movie_id, actor_id, str(cast_dict[actor][1])))
-
-                logging.info("Actors added to the database.")
-
-                if director is not None:
-                    director_id = check_director(director)
-                    if director_id is None:
-                        director_stmt = "INSERT INTO Director (director_name, tmdb_id) VALUES (?, ?)"
-                        cursor.execute(director_stmt, (director, director_id))
-                        director_id = check_director(director)
-
-                    movie_director_stmt = "INSERT INTO Movie_Director (movie_id, director_id) VALUES (?, ?)"
-                    cursor.execute(movie_director_stmt, (movie_id, director_id))
-            else:
-                logging.info(f"Movie {movie_title} already exists in the database.")
-
-            # Commit the transaction
-            connection.commit()
-            logging.info("Transaction committed.")
-            return True
-    except requests.exceptions.HTTPError as e:
-        logging.error("HTTP error occurred while making TMDB API request:", e)
-        # Rollback the transaction in case of an error
-        connection.rollback()
-        return False
-    except Exception as e:
-        logging.error("Error occurred in new_movie function:", e)
-        # Rollback the transaction in case of an error
-        connection.rollback()
-        return False
+    with pool.connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                logging.info(f"Adding movie {movie_title} to database...")
+                # Begin the transaction
+                connection.begin()
+
+                # Get Genres
+                movie = tmdb.Movies(movie_tmdb_id)
+                genres = movie.info().get('genres', [])
+                movie_genres = [genre['name'] for genre in genres]
+
+                # Get Actors and Directors
+                url = f"https://api.themoviedb.org/3/movie/{movie_tmdb_id}/credits?language=en-US"
+                headers = {
+                    "accept": "application/json",
+                    "Authorization": "Bearer " + config.get("TMDB", "ACCESS_TOKEN")
+                }
+                response = requests.get(url, headers=headers)
+                cast_dict = {}
+
+                for cast in response.json().get('cast', []):
+                    cast_dict[cast['name']] = [cast['id'], cast['character']]
+
+                for crew in response.json().get('crew', []):
+                    if crew.get('job') == 'Director':
+                        director = crew['name']
+                        director_id = crew['id']
+                        break
+
+                # Insert movie into DB if not exists
+                movie = check_movie(movie_title, cursor)
+                if movie is None:
+                    movie_stmt = "INSERT INTO Movie (title, release_date, synopsis, tmdb_id) VALUES (?, ?, ?, ?)"
+                    cursor.execute(movie_stmt, (movie_title, movie_release_date, synopsis, movie_tmdb_id))
+                    movie_id = cursor.lastrowid
+                    logging.info(f"Movie {movie_title} added to database. Movie ID: {movie_id}")
+
+                    genre_ids = upsert_genres(movie_genres, cursor)
+                    if movie_genres:
+                        movie_genre_stmt = "INSERT INTO Movie_Genre (movie_id, genre_id) VALUES (?, ?)"
+                        cursor.executemany(movie_genre_stmt, [(movie_id, genre_ids[genre]) for genre in movie_genres])
+
+                    logging.info("Genres added to the database.")
+
+                    actor_ids = upsert_actors([(actor, cast[0]) for actor, cast in cast_dict.items()], cursor)
+                    if cast_dict:
+                        movie_actor_stmt = "INSERT INTO Movie_Actor (movie_id, actor_id, movie_character, billing_order) " \
+                                           "VALUES (?, ?, ?, ?)"
+                        cursor.executemany(movie_actor_stmt, [
+                            (movie_id, actor_ids[str(cast[0])], str(cast[1]), billing_order)
+                            for billing_order, cast in enumerate(cast_dict.values())
+                        ])
+
+                    logging.info("Actors added to the database.")
+
+                    if director is not None:
+                        director_id = upsert_directors([(director, director_id)], cursor)[str(director_id)]
+
+                        movie_director_stmt = "INSERT INTO Movie_Director (movie_id, director_id) VALUES (?, ?)"
+                        cursor.execute(movie_director_stmt, (movie_id, director_id))
+                else:
+                    logging.info(f"Movie {movie_title} already exists in the database.")
+
+                # Commit the transaction
+                connection.commit()
+                logging.info("Transaction committed.")
+                if movie is None:
+                    catalog_changed("insert", movie_id, movie_title)
+                return True
+        except requests.exceptions.HTTPError as e:
+            logging.error("HTTP error occurred while making TMDB API request:", e)
+            # Rollback the transaction in case of an error
+            connection.rollback()
+            return False
+        except Exception as e:
+            logging.error("Error occurred in new_movie function:", e)
+            # Rollback the transaction in case of an error
+            connection.rollback()
+            return False
+
+
+def _upsert(cursor: mariadb.Cursor, table: str, id_column: str, key_column: str, columns: tuple, rows: list) -> dict:
+    """
+    Insert rows that don't exist yet by their unique natural key, and get the ids of all of them
+    :param cursor: Cursor to run on, e.g. inside a transaction
+    :param table: Table name
+    :param id_column: Auto increment id column
+    :param key_column: Column with a unique index
+    :param columns: Columns of the rows, including key_column
+    :param rows: Rows to upsert
+    :return: Dictionary of key to id
+    """
+    if not rows:
+        return {}
+
+    key_index = columns.index(key_column)
+    rows = list({row[key_index]: row for row in rows}.values())
+    keys = [row[key_index] for row in rows]
+
+    # Existing rows keep their id, the key is set to itself so nothing changes
+    cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))}) "
+                       f"ON DUPLICATE KEY UPDATE {key_column} = {key_column}", rows)
+    cursor.execute(f"SELECT {key_column}, {id_column} FROM {table} "
+                   f"WHERE {key_column} IN ({', '.join(['?'] * len(keys))})", keys)
+    return dict(cursor.fetchall())
+
+
+def upsert_genres(names: list[str], cursor: mariadb.Cursor) -> dict[str, int]:
+    """
+    Insert the genres that don't exist yet
+    :param names: Genre names
+    :param cursor: Cursor to run on, e.g. inside a transaction
+    :return: Dictionary of genre name to genre_id
+    """
+    return _upsert(cursor, "Genre", "genre_id", "name", ("name",), [(name,) for name in names])
+
+
+def upsert_actors(actors: list[tuple[str, int | str]], cursor: mariadb.Cursor) -> dict[str, int]:
+    """
+    Insert the actors that don't exist yet, actors are identified by their TMDB id
+    :param actors: List of (actor_name, tmdb_id)
+    :param cursor: Cursor to run on, e.g. inside a transaction
+    :return: Dictionary of TMDB id (as a string) to actor_id
+    """
+    return _upsert(cursor, "Actor", "actor_id", "tmdb_id", ("actor_name", "tmdb_id"),
+                   [(name, str(tmdb_id)) for name, tmdb_id in actors])
+
+
+def upsert_directors(directors: list[tuple[str, int | str]], cursor: mariadb.Cursor) -> dict[str, int]:
+    """
+    Insert the directors that don't exist yet, directors are identified by their TMDB id
+    :param directors: List of (director_name, tmdb_id)
+    :param cursor: Cursor to run on, e.g. inside a transaction
+    :return: Dictionary of TMDB id (as a string) to director_id
+    """
+    return _upsert(cursor, "Director", "director_id", "tmdb_id", ("director_name", "tmdb_id"),
+                   [(name, str(tmdb_id)) for name, tmdb_id in directors])
 
 
-def check_genre(genre: str) -> int | None:
+def check_genre(genre: str, cursor: Optional[mariadb.Cursor] = None) -> int | None:
     """
     Checks if genre exists in database
     :param genre: genre to check
     :type genre: str
+    :param cursor: Cursor to run the check on, e.g. inside a transaction. A pooled cursor is used if None
     :return: genre id if exists, None otherwise
     """
 
-    genre_stmt = "SELECT genre_id FROM Genre WHERE name LIKE ?"
+    genre_stmt = "SELECT genre_id FROM Genre WHERE name = ?"
+    if cursor is None:
+        with pool.cursor() as cursor:
+            return check_genre(genre, cursor)
+
     cursor.execute(genre_stmt, (genre,))
     id = cursor.fetchone()
     if id is None:
@@ -452,16 +570,21 @@ def check_genre(genre: str) -> int | None:
     return id[0]
 
 
-def check_actor(actor: str) -> int | None:
+def check_actor(actor: str, cursor: Optional[mariadb.Cursor] = None) -> int | None:
     """
     Checks if actor exists in database
     :param actor: actor to check
     :type actor: str
+    :param cursor: Cursor to run the check on, e.g. inside a transaction. A pooled cursor is used if None
     :return: actor id if exists, None otherwise
     :rtype: int | None
     """
 
-    actor_stmt = "SELECT actor_id FROM Actor WHERE actor_name LIKE ?"
+    actor_stmt = "SELECT actor_id FROM Actor WHERE actor_name = ?"
+    if cursor is None:
+        with pool.cursor() as cursor:
+            return check_actor(actor, cursor)
+
     cursor.execute(actor_stmt, (actor,))
     id = cursor.fetchone()
     if id is None:
@@ -469,15 +592,20 @@ def check_actor(actor: str) -> int | None:
     return id[0]
 
 
-def check_director(director: str) -> int | None:
+def check_director(director: str, cursor: Optional[mariadb.Cursor] = None) -> int | None:
     """
     Checks if director exists in database
     :param director: director to check
     :type director: str
+    :param cursor: Cursor to run the check on, e.g. inside a transaction. A pooled cursor is used if None
     :return: director id if exists, None otherwise
     :rtype: int | None
     """
-    director_stmt = "SELECT director_id FROM Director WHERE director_name LIKE ?"
+    director_stmt = "SELECT director_id FROM Director WHERE director_name = ?"
+    if cursor is None:
+        with pool.cursor() as cursor:
+            return check_director(director, cursor)
+
     cursor.execute(director_stmt, (director,))
     id = cursor.fetchone()
     if id is None:
@@ -485,15 +613,20 @@ def check_director(director: str) -> int | None:
     return id[0]
 
 
-def check_movie(movie: str) -> int | None:
+def check_movie(movie: str, cursor: Optional[mariadb.Cursor] = None) -> int | None:
     """
     Checks if movie exists in database
     :param movie: movie to check
     :type movie: str
+    :param cursor: Cursor to run the check on, e.g. inside a transaction. A pooled cursor is used if None
     :return: movie id if exists, None otherwise
     :rtype: int | None
     """
-    movie_stmt = "SELECT movie_id FROM Movie WHERE title LIKE ?"
+    movie_stmt = "SELECT movie_id FROM Movie WHERE title = ?"
+    if cursor is None:
+        with pool.cursor() as cursor:
+            return check_movie(movie, cursor)
+
     cursor.execute(movie_stmt, (movie,))
     id = cursor.fetchone()
     if id is None:
@@ -501,61 +634,273 @@ def check_movie(movie: str) -> int | None:
     return id[0]
 
 
-def get_movie_info(movie: str) -> tuple[Any | None, Any | None, Any | None, list[Any] | None | Any]:
+def _count(collection: str, counter: str) -> None:
+    with _metadata_stats_lock:
+        counters = _metadata_stats.setdefault(collection, Counter())
+        counters[counter] += 1
+
+
+def metadata_stats() -> dict:
+    """
+    :return: Per collection counters of the cached TMDB lookups: hits, stale_hits, negative_hits, fetches,
+             negative_stores and errors
+    """
+    with _metadata_stats_lock:
+        return {collection: dict(counters) for collection, counters in _metadata_stats.items()}
+
+
+def create_metadata_indexes() -> None:
+    """
+    Unique indexes on the keys the cached TMDB documents are upserted on, run once at startup
+    """
+    handler.create_unique_index(config.get('MONGODB', 'MOVIE_INFO_COLLECTION'), 'title')
+    handler.create_unique_index(config.get('MONGODB', 'MOVIE_PROVIDER_COLLECTION'), 'movie_tmdb_id')
+
+
+def _store_metadata(collection: str, query: dict, fetch, touch_on_miss: bool = False) -> dict | None:
+    """
+    Fetch a document from TMDB and store it in MongoDB and the in-process cache
+
+    If TMDB doesn't know the document, a negative entry {**query, 'not_found': True} is stored instead so the
+    next reads don't ask again, until it is NEGATIVE_TTL seconds old. Errors (e.g. TMDB unreachable) store nothing.
+    :param collection: MongoDB collection
+    :param query: Query the document is looked up by, the document is upserted on it
+    :param fetch: Returns the document to store, None if TMDB doesn't know it, raises on errors
+    :param touch_on_miss: If nothing was found, keep the stored document and only mark it as fresh
+    :return: The stored document, None on errors
+    """
+    try:
+        document = fetch()
+    except Exception as e:
+        logging.warning(f"Error fetching {query} of {collection} from TMDB: {e}")
+        _count(collection, 'errors')
+        return None
+    _count(collection, 'fetches')
+
+    now = datetime.datetime.utcnow()
+    if document is None or document.get('not_found'):
+        if touch_on_miss:
+            # What we have, found or not, stays until TMDB knows the document again
+            handler.update_document(collection, query, {'fetched_at': now}, '$set')
+            return document
+        _count(collection, 'negative_stores')
+        document = document or {**query, 'not_found': True}
+    else:
+        document['not_found'] = False
+
+    document.setdefault('fetched_at', now)
+    handler.upsert_documents(collection, [(query, document)])
+    handler.set_cached(collection, query, [document])
+    return document
+
+
+def _is_stale(document: dict) -> bool:
+    max_age = NEGATIVE_TTL if document.get('not_found') else STALE_AFTER
+    fetched_at = document.get('fetched_at')
+    return fetched_at is None or fetched_at < datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age)
+
+
+def revalidate(collection: str, query: dict, fetch) -> None:
+    """
+    Refresh a cached document in the background, unless a refresh of it is already queued or being fetched
+    :param collection: MongoDB collection
+    :param query: Query the document is looked up by
+    :param fetch: Returns the document to store, None if TMDB doesn't know it, raises on errors
+    """
+    key = (collection, handler.cache_key(query))
+    with _revalidating_lock:
+        if key in _revalidating or metadata_flight.in_flight(key):
+            return
+        _revalidating.add(key)
+
+    def refresh():
+        try:
+            return metadata_flight.do(key, lambda: _store_metadata(collection, query, fetch, touch_on_miss=True))
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    try:
+        executor.submit_background(refresh, upstream='tmdb')
+    except RuntimeError:
+        # Executor shut down
+        with _revalidating_lock:
+            _revalidating.discard(key)
+
+
+def find_metadata(collection: str, query: dict, fetch) -> list | None:
+    """
+    Stale-while-revalidate lookup of a TMDB document cached in MongoDB
+
+    Cached documents are returned right away, if older than [CACHE] STALE_AFTER they are refreshed in the background.
+    On a miss the document is fetched, concurrent misses of one key share a single fetch.
+    Documents TMDB doesn't know are cached too, marked 'not_found', and re-checked after [CACHE] NEGATIVE_TTL.
+    :param collection: MongoDB collection
+    :param query: Query the document is looked up by, e.g. {'title': ...}
+    :param fetch: Returns the document to store, None if TMDB doesn't know it, raises on errors
+    :return: List with the document (check 'not_found'), None or [] if it couldn't be fetched
+    """
+    data = handler.find_cached(collection, query)
+    if data:
+        _count(collection, 'negative_hits' if data[0].get('not_found') else 'hits')
+        if _is_stale(data[0]):
+            _count(collection, 'stale_hits')
+            revalidate(collection, query, fetch)
+        return data
+
+    document = metadata_flight.do((collection, handler.cache_key(query)),
+                                  lambda: _store_metadata(collection, query, fetch))
+    return [document] if document else data
+
+
+def get_movie_info(movie: str, tmdb_id: int = None) -> tuple[Any | None, Any | None, Any | None, list[Any] | None | Any]:
     """
     Gets movie info from TMDB API, and returns movie info (tmdb_id: int, Poster: str, Banner: str, Rating: list[float, int])
 
     Data is cached in MongoDB, and will be retrieved from there if available.
     :param movie: Movie Title to search for
+    :param tmdb_id: TMDB ID stored with the movie, if known the movie is fetched by id instead of searched by title
     :return: None if movie not found, else returns movie info (Poster: str, Banner: str, Rating: list[float, int])
     """
+    collection = config.get('MONGODB', 'MOVIE_INFO_COLLECTION')
+
+    # In-process or MongoDB cache, TMDB if not cached
+    data = find_metadata(collection, {'title': movie}, lambda: _fetch_movie_info(movie, tmdb_id))
+    if not data:
+        # TMDB couldn't be reached, show the default images without caching them
+        return _movie_info_tuple(_default_movie_info(movie, tmdb_id))
+    return _movie_info_tuple(data[0])
+
+
+def get_movie_info_batch(movies: list[str], tmdb_ids: dict[str, int] = None) -> dict[str, tuple]:
+    """
+    Batch version of get_movie_info, for listing pages
+
+    Titles not in the in-process cache are looked up in MongoDB with a single query, only the misses are fetched
+    from TMDB (at most [EXECUTOR] TMDB_MAX_CONCURRENCY at a time) and stored like get_movie_info stores them.
+    Titles TMDB couldn't be reached for get the default images, without caching them.
+    :param movies: Movie Titles to search for
+    :param tmdb_ids: TMDB IDs stored with the movies by title, misses with a known id are fetched by id
+    :return: Dictionary of title to movie info (tmdb_id: int, Poster: str, Banner: str, Rating: list[float, int])
+    """
+    titles = list(dict.fromkeys(movies))
+    if not titles:
+        return {}
+
+    collection = config.get('MONGODB', 'MOVIE_INFO_COLLECTION')
+    found = {}
+    for title in titles:
+        data = handler.get_cached(collection, {'title': title})
+        if data:
+            found[title] = data[0]
+
+    uncached = [title for title in titles if title not in found]
+    if uncached:
+        data = handler.find_documents(collection, {'title': {'$in': uncached}}, 0) or []
+        for movie_info in data:
+            found[movie_info['title']] = movie_info
+            handler.set_cached(collection, {'title': movie_info['title']}, [movie_info])
+
+    tmdb_ids = tmdb_ids or {}
+    for title, movie_info in found.items():
+        _count(collection, 'negative_hits' if movie_info.get('not_found') else 'hits')
+        if _is_stale(movie_info):
+            _count(collection, 'stale_hits')
+            revalidate(collection, {'title': title}, lambda title=title: _fetch_movie_info(title, tmdb_ids.get(title)))
+
+    def fetch_miss(title: str) -> dict | None:
+        # Same flight as find_metadata, so a title fetched by both shares one request and one upsert
+        query = {'title': title}
+        return metadata_flight.do((collection, handler.cache_key(query)),
+                                  lambda: _store_metadata(collection, query,
+                                                          lambda: _fetch_movie_info(title, tmdb_ids.get(title))))
+
+    misses = [title for title in titles if title not in found]
+    if misses:
+        fetched = executor.map(fetch_miss, misses, upstream='tmdb')
+        for title, movie_info in zip(misses, fetched):
+            found[title] = movie_info or _default_movie_info(title, tmdb_ids.get(title))
+
+    return {title: _movie_info_tuple(found[title]) for title in titles}
+
+
+def _fetch_movie_info(movie: str, tmdb_id: int = None, raise_errors: bool = False) -> dict:
+    """
+    Fetch movie info from TMDB, as the document cached in MongoDB
+    :param movie: Movie Title to search for
+    :param tmdb_id: TMDB ID of the movie, skips the search by title if known
+    :param raise_errors: Raise if the movie isn't found instead of returning the default images, errors other
+                         than not found are always raised
+    :return: Movie info document (tmdb_id, title, poster, banner, rating, not_found, fetched_at)
+    """
     poster_link = config.get('MOVIE', 'TMDB_IMAGE_URL')
     poster = config.get('MOVIE', 'DEFAULT_POSTER_URL')
     banner = config.get('MOVIE', 'DEFAULT_BANNER_URL')
     rating = None
-    movie_id = None
-
-    # Check if movie is in MongoDB cache
-    data = handler.find_documents(config.get('MONGODB', 'MOVIE_INFO_COLLECTION'), {'title': movie})
-    if len(data) > 0:
-        movie_info = data[0]
-        if movie_info['poster'] is not None:
-            poster = movie_info['poster']
-        if movie_info['banner'] is not None:
-            banner = movie_info['banner']
-        if movie_info['rating'] is not None:
-            rating = movie_info['rating']
-        if movie_info['tmdb_id'] is not None:
-            movie_id = movie_info['tmdb_id']
-    # If not in MongoDB cache, check TMDB
-    else:
-        try:
+    movie_id = tmdb_id
+    not_found = False
+
+    try:
+        if movie_id is None:
             movie_id = tmdb.Search().movie(query=movie)['results'][0]['id']
-            movie_info = tmdb.Movies(movie_id).info()
-
-            if movie_info is not None:
-                if movie_info['poster_path'] is not None:
-                    poster = poster_link + movie_info['poster_path']
-                if movie_info['backdrop_path'] is not None:
-                    banner = poster_link + movie_info['backdrop_path']
-                try:
-                    rating = [movie_info['vote_average'], movie_info['vote_count']]
-                except KeyError:
-                    rating = None
-        except (TypeError, IndexError):
-            # Not all movies we have in the database are in the tmdb database
-            logging.warning(f"Movie {movie} not found in TMDB database.")
-
-        # Add movie info to MongoDB cache
-        handler.insert_document(config.get('MONGODB', 'MOVIE_INFO_COLLECTION'), {
-            'tmdb_id': movie_id,
-            'title': movie,
-            'poster': poster,
-            'banner': banner,
-            'rating': rating
-        }, True)
-
-    return movie_id, poster, banner, rating
+        movie_info = tmdb.Movies(movie_id).info()
+
+        if movie_info is not None:
+            if movie_info['poster_path'] is not None:
+                poster = poster_link + movie_info['poster_path']
+            if movie_info['backdrop_path'] is not None:
+                banner = poster_link + movie_info['backdrop_path']
+            try:
+                rating = [movie_info['vote_average'], movie_info['vote_count']]
+            except KeyError:
+                rating = None
+    except (IndexError, requests.exceptions.HTTPError) as e:
+        # Only an empty search or a 404 means TMDB doesn't know the movie, other errors (401, 429, 5xx) are raised
+        # so nothing is cached and the next read asks again
+        if isinstance(e, requests.exceptions.HTTPError) and not tmdb_not_found(e):
+            raise e
+        # Not all movies we have in the database are in the tmdb database
+        logging.warning(f"Movie {movie} not found in TMDB database.")
+        if raise_errors:
+            raise e
+        not_found = True
+
+    return {
+        'tmdb_id': movie_id,
+        'title': movie,
+        'poster': poster,
+        'banner': banner,
+        'rating': rating,
+        # Negative entry with the default images, re-checked after [CACHE] NEGATIVE_TTL
+        'not_found': not_found,
+        # When TMDB was asked, the refresher re-fetches the oldest entries
+        'fetched_at': datetime.datetime.utcnow()
+    }
+
+
+def tmdb_not_found(error: Exception) -> bool:
+    """
+    :param error: Exception raised by a TMDB request
+    :return: True if TMDB answered 404, i.e. it doesn't know what was asked for
+    """
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.exceptions.HTTPError) and response is not None and response.status_code == 404
+
+
+def _default_movie_info(movie: str, tmdb_id: int = None) -> dict:
+    """
+    Movie info with the default images, shown when TMDB couldn't be reached and not cached
+    """
+    return {'tmdb_id': tmdb_id, 'title': movie, 'poster': None, 'banner': None, 'rating': None}
+
+
+def _movie_info_tuple(movie_info: dict) -> tuple[Any | None, Any | None, Any | None, list[Any] | None | Any]:
+    """
+    Convert a cached movie info document to (tmdb_id, poster, banner, rating), filling in the default images
+    """
+    poster = movie_info['poster'] or config.get('MOVIE', 'DEFAULT_POSTER_URL')
+    banner = movie_info['banner'] or config.get('MOVIE', 'DEFAULT_BANNER_URL')
+    return movie_info['tmdb_id'], poster, banner, movie_info['rating']
 
 
 def movie_providers(tmdb_id: int) -> dict:
@@ -564,139 +909,102 @@ def movie_providers(tmdb_id: int) -> dict:
 
     Data is cached in MongoDB
     :param tmdb_id: TMDB ID of movie
-    :return: Dictionary of providers
+    :return: Dictionary of providers, None if there are none or the movie has no TMDB ID
     """
+    if tmdb_id is None:
+        return None
+
+    def fetch():
+        try:
+            providers = _fetch_movie_providers(tmdb_id)
+        except requests.exceptions.HTTPError as e:
+            # Only a 404 is cached as a negative entry, other errors are counted and nothing is cached
+            if not tmdb_not_found(e):
+                raise e
+            return None
+        # No US providers is cached as a negative entry
+        return {'movie_tmdb_id': tmdb_id, 'providers': providers} if providers else None
 
-    data = handler.find_documents(
-        config.get('MONGODB', 'MOVIE_PROVIDER_COLLECTION'),
-        {'movie_tmdb_id': tmdb_id}
-    )
+    data = find_metadata(config.get('MONGODB', 'MOVIE_PROVIDER_COLLECTION'), {'movie_tmdb_id': tmdb_id}, fetch)
 
-    if data is not None and len(data) > 0:
+    if data and not data[0].get('not_found'):
         return data[0]['providers']
-    else:
-        url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/watch/providers"
-
-        headers = {
-            "accept": "application/json",
-            "Authorization": "Bearer " + config.get("TMDB", "ACCESS_TOKEN")
-        }
-
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            if 'US' in response.json()['results']:
-                providers = response.json()['results']['US']
-                handler.insert_document(config.get('MONGODB', 'MOVIE_PROVIDER_COLLECTION'),
-                                        {'movie_tmdb_id': tmdb_id, 'providers': providers}, True)
-                # Return inserted data
-                return providers
-
-
-def movie_recommendation(user_id: int = None, limit: int = 6) -> list[tuple[str, str]]:
-    """
-    Get random movies based on the movie genres the user has watched, with additional recommendations.
-
-    SQL Statement will grab movies that have the same genre as the user's watched movies, and then
-    randomly select a movie from that list. If the list is empty, then it will grab a random movie
-    from the database.
-    :param user_id: User ID
-    :param limit: Number of movies to return
-    :return: List of movies (title, poster_link)
-    """
-
-    def get_movie_info_concurrently(movies):
-        result = []
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(get_movie_info, movie[0]) for movie in movies]
-
-            for movie, future in zip(movies, futures):
-                movie_title = movie[0]
-                try:
-                    movie_id, poster, banner, rating = future.result()
-                    if poster is None:
-                        poster = config.get("MOVIE", "DEFAULT_POSTER_URL")
-                    result.append((movie_title, poster))
-                except Exception as e:
-                    logging.error(f"Error occurred while fetching movie info for '{movie_title}': {str(e)}")
-        return result
-
-    # Get user's watched movies and their genres from MongoDB "watchlist" collection
-    watched_movies_document = handler.find_documents(config.get('MONGODB', 'WATCHLIST_COLLECTION'),
-                                                     {'user_id': user_id})
-    watched_movies = watched_movies_document[0].get('watchlist_arr', []) if watched_movies_document else []
-
-    genres = Counter(get_genre(int(movie)) for movie in watched_movies if get_genre(int(movie)))
-
-    if genres:
-        most_common_genre = genres.most_common(1)[0][0]
-
-        # Create a read-only transaction
-        cursor.execute("START TRANSACTION READ ONLY")
-
-        # Get random movies from the most common genre within +-1 year of the current date,
-        # including movies from the current year
-        stmt = "SELECT DISTINCT Movie.title " \
-               "FROM Movie " \
-               "LEFT JOIN Movie_Genre " \
-               "ON Movie.movie_id = Movie_Genre.movie_id " \
-               "LEFT JOIN Movie_Director " \
-               "ON Movie.movie_id = Movie_Director.movie_id " \
-               "LEFT JOIN Movie_Actor " \
-               "ON Movie.movie_id = Movie_Actor.movie_id " \
-               "WHERE Movie_Genre.genre_id = ? " \
-               "AND (Movie.release_date " \
-               "BETWEEN DATE_SUB(NOW(), INTERVAL 1 YEAR) " \
-               "AND DATE_ADD(NOW(), INTERVAL 1 YEAR) " \
-               "OR YEAR(Movie.release_date) = YEAR(NOW())) " \
-               "AND Movie.movie_id NOT IN (" + ",".join(["?"] * len(watched_movies)) + ") " \
-                                                                                       "ORDER BY RAND() " \
-                                                                                       "LIMIT ?"
-
-        cursor.execute(stmt, (most_common_genre, *watched_movies, limit))
-        movies = cursor.fetchall()
-
-        result = get_movie_info_concurrently(movies)
-        return result
-
-        # Create a read-only transaction
-    cursor.execute("START TRANSACTION READ ONLY")
-
-    # Return random movies if no genres are found or no movies match the criteria in 1 year range
-    stmt = "SELECT title " \
-           "FROM Movie " \
-           "WHERE release_date BETWEEN DATE_SUB(NOW(), INTERVAL 1 YEAR) AND DATE_ADD(NOW(), INTERVAL 1 YEAR) " \
-           "ORDER BY RAND() " \
-           "LIMIT ?"
-    cursor.execute(stmt, (*watched_movies, limit))
-    movies = cursor.fetchall()
-
-    result = get_movie_info_concurrently(movies)
-    return result
+
+
+def _fetch_movie_providers(tmdb_id: int) -> dict | None:
+    """
+    Fetch the US watch providers of a movie from TMDB
+    :param tmdb_id: TMDB ID of movie
+    :return: Dictionary of providers, {} if the movie has none in the US
+    :raises requests.exceptions.HTTPError: If TMDB didn't answer 200, with the response (see tmdb_not_found)
+    """
+    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}/watch/providers"
+
+    headers = {
+        "accept": "application/json",
+        "Authorization": "Bearer " + config.get("TMDB", "ACCESS_TOKEN")
+    }
+
+    response = requests.get(url, headers=headers)
+    if response.status_code != 200:
+        logging.warning(f"Error fetching providers of movie {tmdb_id} from TMDB: {response.status_code}")
+        raise requests.exceptions.HTTPError(f"{response.status_code} fetching providers of movie {tmdb_id}",
+                                            response=response)
+    return response.json().get('results', {}).get('US', {})
+
+
+def get_genres(movie_ids: list[int]) -> dict[int, list[int]]:
+    """
+    Get the genres of many movies with one query (Movie_Genre table)
+    :param movie_ids: Movie IDs, None ids (e.g. reviews of a movie that wasn't found) are skipped
+    :return: Dictionary of movie_id to its genre ids, ordered by genre_id, movies without genres are left out
+    """
+    movie_ids = list(dict.fromkeys(int(movie_id) for movie_id in movie_ids if movie_id is not None))
+    if not movie_ids:
+        return {}
+
+    stmt = "SELECT movie_id, genre_id FROM Movie_Genre " \
+           "WHERE movie_id IN (" + ",".join(["?"] * len(movie_ids)) + ") " \
+           "ORDER BY movie_id, genre_id"
+    with pool.cursor() as cursor:
+        cursor.execute(stmt, movie_ids)
+        rows = cursor.fetchall()
+
+    genres = {}
+    for movie_id, genre_id in rows:
+        genres.setdefault(movie_id, []).append(genre_id)
+    return genres
+
+
+def get_genre_names(movie_ids: list[int]) -> dict[int, list[str]]:
+    """
+    Get the genre names of many movies with one query
+    :param movie_ids: Movie IDs
+    :return: Dictionary of movie_id to its genre names, movies without genres are left out
+    """
+    names = genre_names()
+    return {movie_id: [names[genre_id] for genre_id in genre_ids if genre_id in names]
+            for movie_id, genre_ids in get_genres(movie_ids).items()}
 
 
 def get_genre(movie_id: int) -> int | None:
     """
-    Get genre of movie from DB (Movie_Genre table)
-    :param movie_id: TMDB ID of movie
-    :return: Genre of movie
+    Get genre of movie from DB (Movie_Genre table), use get_genres for many movies
+    :param movie_id: Movie ID
+    :return: First genre of movie
     """
-    stmt = "SELECT genre_id FROM Movie_Genre WHERE movie_id = ?"
-    cursor.execute(stmt, (movie_id,))
-    genre = cursor.fetchone()
-    if genre is None:
+    if movie_id is None:
         return None
-    return genre[0]
+    genres = get_genres([movie_id]).get(int(movie_id))
+    if not genres:
+        return None
+    return genres[0]
 
 
-def get_genre_name(genre_id: int) -> int | None:
+def get_genre_name(genre_id: int) -> str | None:
     """
-    Get genre of movie from DB (Movie_Genre table)
+    Get the name of a genre, from the in-memory Genre table
     :param genre_id: Genre ID
     :return: Genre name of genre id
     """
-    stmt = "SELECT name FROM Genre WHERE genre_id = ?"
-    cursor.execute(stmt, (genre_id,))
-    genre = cursor.fetchone()
-    if genre is None:
-        return None
-    return genre[0]
+    return genre_names().get(genre_id)
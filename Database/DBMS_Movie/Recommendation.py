@@ -0,0 +1,261 @@
+####################################################################################################
+# Home page recommendations.                                                                       #
+# Candidates are precomputed per genre and time window (released within WINDOW days of today, or  #
+# any time) by a background thread. Each user's genre profile (genre counts over their watchlist)  #
+# is kept in memory and updated as movies are added or removed, so a recommendation is a sample    #
+# from in-memory lists instead of a query per watchlist entry and an ORDER BY RAND().              #
+# Movies similar to the user's last saved movie (see Similarity) come before the genre picks.      #
+####################################################################################################
+
+import datetime
+import logging
+import random
+import threading
+from collections import Counter
+
+from Database.Cache import LRUCache, MISSING
+from .Events import on_catalog_change
+from .Movie import config, handler, pool, get_movie_info_batch
+from .Similarity import similar_movies
+
+RECENT = 'recent'
+ALL = 'all'
+
+
+class RecommendationEngine:
+    """
+    Background-refreshed candidate sets and incrementally updated user genre profiles
+    """
+
+    def __init__(self, refresh_interval: int = 900, window: int = 365, profile_ttl: int = 3600,
+                 max_profiles: int = 10000, warmup_timeout: float = 2):
+        """
+        :param refresh_interval: Seconds between refreshes of the candidates
+        :param window: Movies released within this many days of today (or this year) are recent
+        :param profile_ttl: Seconds a user's profile stays in memory before it is reloaded from the watchlist
+        :param max_profiles: Maximum number of profiles in memory
+        :param warmup_timeout: Seconds a request waits for the first refresh before rendering without recommendations
+        """
+        self.refresh_interval = refresh_interval
+        self.window = window
+        self.warmup_timeout = warmup_timeout
+        # User id -> (genre Counter, watched movie ids as dict keys in the order they were saved)
+        self.profiles = LRUCache(max_size=max_profiles, ttl=profile_ttl)
+        # Movie id -> genre ids, for profiles
+        self._genres = {}
+        # Movie id -> (movie_id, title, tmdb_id)
+        self._movies = {}
+        # (genre id, window) -> movies (movie_id, title, tmdb_id), None as genre id for every genre
+        self._candidates = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _is_recent(self, release_date: datetime.date, today: datetime.date) -> bool:
+        if release_date is None:
+            return False
+        return abs((release_date - today).days) <= self.window or release_date.year == today.year
+
+    def refresh(self) -> None:
+        """
+        Reload the movie genres and the candidate sets from the database
+        """
+        stmt = "SELECT Movie.movie_id, Movie.title, Movie.tmdb_id, Movie.release_date, Movie_Genre.genre_id " \
+               "FROM Movie " \
+               "LEFT JOIN Movie_Genre " \
+               "ON Movie.movie_id = Movie_Genre.movie_id"
+
+        with pool.cursor() as cursor:
+            cursor.execute(stmt)
+            rows = cursor.fetchall()
+
+        today = datetime.date.today()
+        genres = {}
+        candidates = {}
+        movies = {}
+        for movie_id, title, tmdb_id, release_date, genre_id in rows:
+            movie = (movie_id, title, tmdb_id)
+            windows = (RECENT, ALL) if self._is_recent(release_date, today) else (ALL,)
+            if genre_id is not None:
+                genres.setdefault(movie_id, []).append(genre_id)
+                for window in windows:
+                    candidates.setdefault((genre_id, window), []).append(movie)
+            if movie_id not in movies:
+                movies[movie_id] = movie
+                for window in windows:
+                    candidates.setdefault((None, window), []).append(movie)
+
+        with self._lock:
+            self._genres = genres
+            self._candidates = candidates
+            self._movies = movies
+        # Genres may have changed, profiles are rebuilt from the watchlists on their next use
+        self.profiles.clear()
+        self._ready.set()
+        logging.info(f"Recommendation candidates refreshed: {len(movies)} movies, {len(candidates)} sets")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Error refreshing recommendation candidates: {e}")
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """
+        Start the background refresh thread if it isn't running
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="recommendations", daemon=True)
+                self._thread.start()
+
+    def invalidate(self) -> None:
+        """
+        Refresh as soon as possible, e.g. after the catalog changed
+        """
+        self._wake.set()
+
+    def profile(self, user_id: int) -> tuple[Counter, dict]:
+        """
+        Genre profile of a user, loaded from the watchlist on first use
+        :param user_id: User ID
+        :return: (genre id -> number of watched movies, watched movie ids as keys, last saved last)
+        """
+        profile = self.profiles.get(user_id)
+        if profile is not MISSING:
+            return profile
+
+        document = handler.find_documents(config.get('MONGODB', 'WATCHLIST_COLLECTION'), {'user_id': user_id})
+        watched = dict.fromkeys(int(movie) for movie in document[0].get('watchlist_arr', [])) if document else {}
+        with self._lock:
+            genres = Counter(genre_id for movie_id in watched for genre_id in self._genres.get(movie_id, []))
+        profile = (genres, watched)
+        if self._ready.is_set():
+            self.profiles.set(user_id, profile)
+        return profile
+
+    def watchlist_changed(self, user_id: int, movie_id: int, added: bool) -> None:
+        """
+        Update a user's profile after a movie was added to or removed from the watchlist
+        :param user_id: User ID
+        :param movie_id: Movie ID
+        :param added: True if added, False if removed
+        """
+        profile = self.profiles.get(user_id)
+        if profile is MISSING:
+            # Loaded from the watchlist on the next recommendation
+            return
+
+        genres, watched = profile
+        movie_id = int(movie_id)
+        with self._lock:
+            if added and movie_id not in watched:
+                watched[movie_id] = None
+                genres.update(self._genres.get(movie_id, []))
+            elif not added and movie_id in watched:
+                del watched[movie_id]
+                genres.subtract(self._genres.get(movie_id, []))
+                for genre_id in [genre_id for genre_id, count in genres.items() if count <= 0]:
+                    del genres[genre_id]
+
+    def because_you_saved(self, user_id: int, tries: int = 3) -> tuple[tuple | None, list[tuple]]:
+        """
+        Unwatched movies similar to one of the user's last saved movies
+        :param user_id: User ID
+        :param tries: Number of last saved movies to try, for movies without similar movies
+        :return: (saved movie (movie_id, title, tmdb_id), similar movies, most similar first) or (None, [])
+        """
+        self.start()
+        self._ready.wait(self.warmup_timeout)
+
+        _, watched = self.profile(user_id)
+        with self._lock:
+            last_saved = list(watched)[::-1][:tries]
+            watched = set(watched)
+            movies = self._movies
+
+        for movie_id in last_saved:
+            similar = [movies[neighbour] for neighbour, _ in similar_movies(movie_id)
+                       if neighbour in movies and neighbour not in watched]
+            if similar and movie_id in movies:
+                return movies[movie_id], similar
+        return None, []
+
+    def recommend(self, user_id: int = None, limit: int = 6) -> tuple[tuple | None, list[tuple]]:
+        """
+        Pick unwatched movies: the movies most similar to one the user saved last, then random recent movies of the
+        user's most watched genres, then older movies of those genres, then any recent movie
+        :param user_id: User ID, None for random recent movies
+        :param limit: Number of movies
+        :return: (saved movie the first picks are similar to or None, list of movies), movies are
+                 (movie_id, title, tmdb_id)
+        """
+        self.start()
+        self._ready.wait(self.warmup_timeout)
+
+        source, picked = None, []
+        if user_id is not None:
+            source, similar = self.because_you_saved(user_id)
+            picked = similar[:limit]
+
+        genres, watched = self.profile(user_id) if user_id is not None else (Counter(), {})
+        with self._lock:
+            # Copied under the lock, a profile update may run at the same time
+            order = [genre_id for genre_id, _ in genres.most_common()]
+            watched = set(watched)
+            candidates = self._candidates
+
+        picked_ids = {movie[0] for movie in picked}
+        sets = [(genre_id, window) for window in (RECENT, ALL) for genre_id in order] + [(None, RECENT)]
+        for key in sets:
+            movies = [movie for movie in candidates.get(key, [])
+                      if movie[0] not in watched and movie[0] not in picked_ids]
+            for movie in random.sample(movies, min(limit - len(picked), len(movies))):
+                picked.append(movie)
+                picked_ids.add(movie[0])
+            if len(picked) >= limit:
+                break
+        return source, picked
+
+
+recommendation_engine = RecommendationEngine(
+    refresh_interval=config.getint('RECOMMENDATION', 'REFRESH_INTERVAL', fallback=900),
+    window=config.getint('RECOMMENDATION', 'WINDOW', fallback=365),
+    profile_ttl=config.getint('RECOMMENDATION', 'PROFILE_TTL', fallback=3600)
+)
+
+
+@on_catalog_change
+def _refresh_recommendations(action: str, movie_id: int = None, title: str = None) -> None:
+    if action != "refresh":
+        recommendation_engine.invalidate()
+
+
+def movie_recommendation(user_id: int = None, limit: int = 6) -> tuple[str | None, list[tuple[str, str]]]:
+    """
+    Get movies based on the movies the user has saved to their watchlist
+
+    Movies similar to one the user saved last come first, then movies of the user's most saved genres released
+    within [RECOMMENDATION] WINDOW days, random recent movies if the user has no watchlist or is not logged in.
+    :param user_id: User ID
+    :param limit: Number of movies to return
+    :return: Title of the saved movie the first ones are similar to, for "Because you saved ...", or None,
+             list of movies (title, poster_link)
+    """
+    source, movies = recommendation_engine.recommend(user_id, limit)
+    movie_info = get_movie_info_batch([movie[1] for movie in movies], {movie[1]: movie[2] for movie in movies})
+    return source[1] if source else None, [(movie[1], movie_info[movie[1]][1]) for movie in movies]
+
+
+def watchlist_changed(user_id: int, movie_id: int, added: bool) -> None:
+    """
+    Keep the user's recommendation profile up to date, call after changing the watchlist
+    :param user_id: User ID
+    :param movie_id: Movie ID
+    :param added: True if the movie was added, False if removed
+    """
+    recommendation_engine.watchlist_changed(user_id, movie_id, added)
@@ -0,0 +1,148 @@
+####################################################################################################
+# Background refresh of the TMDB metadata cached in MongoDB (posters, banners, ratings and watch   #
+# providers). Every cached document records when it was fetched, and entries older than MAX_AGE   #
+# are re-fetched a batch at a time, the ones requested recently (hot in the in-process cache)      #
+# first and then the oldest. Readers keep being served from the cache while this runs.             #
+####################################################################################################
+import datetime
+import logging
+import threading
+import time
+
+import requests
+from pymongo import ASCENDING
+
+from Database.Cache import MISSING
+from .Ingest import rate_limiter
+from .Movie import config, executor, handler, tmdb_not_found, _fetch_movie_info, _fetch_movie_providers
+
+
+class MetadataRefresher:
+    """
+    Re-fetches stale movie_info and movie_provider documents in rate-limited batches, on the tmdb_bulk upstream
+    """
+
+    def __init__(self, interval: int = 300, max_age: int = 604800, batch_size: int = 50):
+        """
+        :param interval: Seconds between batches
+        :param max_age: Seconds after which a cached document is stale
+        :param batch_size: Documents refreshed per collection and batch
+        """
+        self.interval = interval
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.movie_info_collection = config.get('MONGODB', 'MOVIE_INFO_COLLECTION')
+        self.provider_collection = config.get('MONGODB', 'MOVIE_PROVIDER_COLLECTION')
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _stale(self, collection: str, key: str) -> list[dict]:
+        """
+        The stale documents to refresh next, recently requested ones first, then the oldest
+        :param collection: MongoDB collection
+        :param key: Field the documents are looked up by, e.g. title
+        :return: Up to batch_size documents
+        """
+        stale = {'$or': [{'fetched_at': {'$lt': datetime.datetime.utcnow() - datetime.timedelta(seconds=self.max_age)}},
+                         {'fetched_at': {'$exists': False}}]}
+
+        # In-process cache keys are the lookup queries, e.g. (('title', 'Avatar'),)
+        hot = [dict(cache_key).get(key) for cache_key in handler.cache.collection(collection).keys()]
+        hot = [value for value in hot if value is not None][:self.batch_size * 10]
+
+        documents = []
+        if hot:
+            documents = handler.find_documents(collection, {'$and': [stale, {key: {'$in': hot}}]},
+                                               self.batch_size) or []
+        if len(documents) < self.batch_size:
+            seen = [document['_id'] for document in documents]
+            documents += handler.find_documents(collection, {'$and': [stale, {'_id': {'$nin': seen}}]},
+                                                self.batch_size - len(documents),
+                                                sort=[('fetched_at', ASCENDING)]) or []
+        return documents
+
+    # The _refresh_* functions return the fetched data, None if TMDB doesn't know the movie (only fetched_at is
+    # updated), or MISSING if TMDB couldn't be reached (the document is left as is and retried next batch)
+
+    def _refresh_movie_info(self, document: dict):
+        rate_limiter.wait()
+        try:
+            return _fetch_movie_info(document['title'], document.get('tmdb_id'), raise_errors=True)
+        except IndexError:
+            return None
+        except (TypeError, requests.exceptions.RequestException) as e:
+            if tmdb_not_found(e):
+                return None
+            logging.warning(f"Error refreshing movie info of {document['title']}: {e}")
+            return MISSING
+
+    def _refresh_providers(self, document: dict):
+        rate_limiter.wait()
+        try:
+            return _fetch_movie_providers(document['movie_tmdb_id'])
+        except requests.exceptions.RequestException as e:
+            if tmdb_not_found(e):
+                return None
+            logging.warning(f"Error refreshing providers of movie {document['movie_tmdb_id']}: {e}")
+            return MISSING
+
+    def refresh(self) -> int:
+        """
+        Refresh one batch of stale documents of each collection
+        :return: Number of documents refreshed
+        """
+        now = datetime.datetime.utcnow()
+        refreshed = 0
+
+        documents = self._stale(self.movie_info_collection, 'title')
+        if documents:
+            # Waiting for the rate limiter holds a tmdb_bulk slot, never one of the slots serving page requests
+            fetched = executor.map(self._refresh_movie_info, documents, upstream='tmdb_bulk')
+            # Keep what we have if TMDB didn't know the movie this time, and try again after max_age. Documents that
+            # couldn't be fetched stay stale, a TMDB outage must not mark them fresh
+            updates = [({'title': document['title']}, {'fetched_at': now} if movie_info is None else movie_info)
+                       for document, movie_info in zip(documents, fetched) if movie_info is not MISSING]
+            handler.upsert_documents(self.movie_info_collection, updates)
+            refreshed += len(updates)
+
+        documents = self._stale(self.provider_collection, 'movie_tmdb_id')
+        if documents:
+            fetched = executor.map(self._refresh_providers, documents, upstream='tmdb_bulk')
+            updates = [({'movie_tmdb_id': document['movie_tmdb_id']},
+                        {'fetched_at': now} if providers is None else
+                        {'providers': providers, 'not_found': not providers, 'fetched_at': now})
+                       for document, providers in zip(documents, fetched) if providers is not MISSING]
+            handler.upsert_documents(self.provider_collection, updates)
+            refreshed += len(updates)
+
+        if refreshed:
+            logging.info(f"Refreshed {refreshed} cached metadata documents")
+        return refreshed
+
+    def _run(self) -> None:
+        while True:
+            try:
+                # Keep going while there is a backlog, then wait for the next interval
+                while self.refresh() >= self.batch_size * 2:
+                    pass
+            except Exception as e:
+                logging.error(f"Error refreshing cached metadata: {e}")
+            time.sleep(self.interval)
+
+    def start(self) -> None:
+        """
+        Start the background refresh thread if it isn't running
+        """
+        with self._lock:
+            if self._thread is None:
+                handler.create_index(self.movie_info_collection, 'fetched_at')
+                handler.create_index(self.provider_collection, 'fetched_at')
+                self._thread = threading.Thread(target=self._run, name="metadata-refresher", daemon=True)
+                self._thread.start()
+
+
+metadata_refresher = MetadataRefresher(
+    interval=config.getint('REFRESH', 'INTERVAL', fallback=300),
+    max_age=config.getint('REFRESH', 'MAX_AGE', fallback=604800),
+    batch_size=config.getint('REFRESH', 'BATCH_SIZE', fallback=50)
+)
@@ -0,0 +1,105 @@
+####################################################################################################
+# Review statistics for the admin dashboard, kept up to date as reviews are written.              #
+# Every rating is added to its movie's total and to the total of the movie's (first) genre with   #
+# one atomic $inc, so the dashboard reads one small document per genre instead of scanning every   #
+# review. rebuild_review_stats() recomputes everything from the reviews (see Analytics), to       #
+# backfill or repair.                                                                              #
+# Run from the project root: python -m Database.DBMS_Movie.ReviewStats                             #
+####################################################################################################
+import logging
+import threading
+
+from .Analytics import genre_rating_totals, movie_rating_totals
+from .Movie import config, handler, get_genre_names
+
+REVIEW_STATS_COLLECTION = config.get('MONGODB', 'REVIEW_STATS_COLLECTION', fallback='review_stats')
+
+MOVIE_STATS = 'movie'
+GENRE_STATS = 'genre'
+
+_indexed = False
+_index_lock = threading.Lock()
+
+
+def _ensure_indexes() -> None:
+    global _indexed
+    with _index_lock:
+        if not _indexed:
+            # One document per statistic, concurrent first ratings of a movie can't create two
+            handler.create_index(REVIEW_STATS_COLLECTION, [('kind', 1), ('key', 1)], unique=True)
+            _indexed = True
+
+
+def _score(rating) -> int | None:
+    # Ratings are stored as submitted by the form, a review may have a comment and no rating
+    try:
+        return int(rating)
+    except (TypeError, ValueError):
+        return None
+
+
+def record_rating(movie_id: int, rating) -> None:
+    """
+    Add a new rating to the movie's and its genre's totals, call after storing the review
+    :param movie_id: Movie ID
+    :param rating: Rating as submitted, ignored if it isn't a number
+    """
+    score = _score(rating)
+    if movie_id is None or score is None:
+        return
+
+    _ensure_indexes()
+    movie_id = int(movie_id)
+    updates = [({'kind': MOVIE_STATS, 'key': movie_id}, {'total': score, 'count': 1})]
+    genres = get_genre_names([movie_id]).get(movie_id)
+    if genres:
+        updates.append(({'kind': GENRE_STATS, 'key': genres[0]}, {'total': score, 'count': 1}))
+    handler.increment_documents(REVIEW_STATS_COLLECTION, updates)
+
+
+def genre_totals() -> dict[str, int]:
+    """
+    Total of the ratings of every genre's movies, a movie counts towards its first genre
+    :return: Dictionary of genre name to total, highest first
+    """
+    documents = handler.find_documents(REVIEW_STATS_COLLECTION, {'kind': GENRE_STATS}, 0) or []
+    documents.sort(key=lambda document: document.get('total', 0), reverse=True)
+    return {document['key']: document.get('total', 0) for document in documents}
+
+
+def movie_totals(movie_id: int) -> dict:
+    """
+    :param movie_id: Movie ID
+    :return: {total, count} of the movie's ratings
+    """
+    documents = handler.find_documents(REVIEW_STATS_COLLECTION, {'kind': MOVIE_STATS, 'key': int(movie_id)}, 1)
+    if not documents:
+        return {'total': 0, 'count': 0}
+    return {'total': documents[0].get('total', 0), 'count': documents[0].get('count', 0)}
+
+
+def rebuild_review_stats() -> int:
+    """
+    Recompute every statistic from the review collection, summed by an aggregation pipeline
+    :return: Number of ratings counted
+    """
+    _ensure_indexes()
+    movies = movie_rating_totals()
+    genres = genre_rating_totals()
+
+    updates = [({'kind': MOVIE_STATS, 'key': movie_id}, {'total': movie['total'], 'count': movie['count']})
+               for movie_id, movie in movies.items()]
+    updates += [({'kind': GENRE_STATS, 'key': genre}, totals) for genre, totals in genres.items()]
+    handler.upsert_documents(REVIEW_STATS_COLLECTION, updates)
+
+    # Statistics of movies and genres that no longer have ratings
+    handler.delete_documents(REVIEW_STATS_COLLECTION, {'kind': MOVIE_STATS, 'key': {'$nin': list(movies)}}, many=True)
+    handler.delete_documents(REVIEW_STATS_COLLECTION, {'kind': GENRE_STATS, 'key': {'$nin': list(genres)}}, many=True)
+
+    ratings = sum(movie['count'] for movie in movies.values())
+    logging.info(f"Review statistics rebuilt from {ratings} ratings")
+    return ratings
+
+
+if __name__ == "__main__":
+    print(f"[+] Review statistics rebuilt from {rebuild_review_stats()} ratings")
@@ -3,7 +3,9 @@ import logging
 import mariadb
 
 from Config.ConfigManager import ConfigManager
-from .DB_Connect import DBConnection
+from .DB_Connect import DBConnectionPool
+from .SearchIndex import catalog_search
+from .SearchCache import search_cache
 from .. import Mongo
 
 # Initialize the config manager
@@ -18,89 +20,87 @@ handler = Mongo.MongoDBHandler.get_instance(
 )
 
 # This is only for DBMS_Movie
-connection = DBConnection().connection
-cursor = connection.cursor()
+pool = DBConnectionPool()
 
+# Seconds a search waits for the search indexes to be built before falling back to LIKE
+INDEX_WARMUP_TIMEOUT = config.getint('SEARCH', 'INDEX_WARMUP_TIMEOUT', fallback=5)
 
-def search_directors(name: str) -> tuple or None:
-    search_stmt = "SELECT * FROM Director WHERE director_name LIKE ? LIMIT 30"
-    term_data = handler.find_documents(config.get('MONGODB', 'SEARCH_CACHE_COLLECTION'),
-                                       {'term': name, 'type': 'directors'})
-
-    if term_data:
-        data = term_data[0]['data']
-        if data:
-            return data
 
-    try:
-        cursor.execute(search_stmt, ('%' + name + '%',))
-    except mariadb.DataError as e:
-        logging.error(f"Error searching for directors from the database: {e}")
-        return None
+# LIKE fallback while the search indexes are being built, same columns as the indexes
+LIKE_STMTS = {
+    'movies': "SELECT movie_id, title, release_date, synopsis, tmdb_id FROM Movie WHERE title LIKE ? LIMIT 30",
+    'actors': "SELECT actor_id, actor_name, tmdb_id FROM Actor WHERE actor_name LIKE ? LIMIT 30",
+    'directors': "SELECT director_id, director_name, tmdb_id FROM Director WHERE director_name LIKE ? LIMIT 30",
+}
 
-    data = cursor.fetchall()
 
-    if not data:
-        return []
+def _search(search_type: str, name: str) -> tuple[list | None, bool]:
+    """
+    Search one type in the search index, or with LIKE if the index isn't built yet
+    :param search_type: "movies", "actors" or "directors"
+    :param name: Search term
+    :return: List of rows (None on error), and whether they came from the index. LIKE results are unranked
+             and must not be cached, or they would be served after the index is ready
+    """
+    if catalog_search.ready(INDEX_WARMUP_TIMEOUT):
+        return getattr(catalog_search, search_type).search(name, limit=30), True
 
-    handler.insert_document(config.get('MONGODB', 'SEARCH_CACHE_COLLECTION'),
-                            {'term': name, 'type': 'directors', 'data': data})
+    try:
+        with pool.cursor() as cursor:
+            cursor.execute(LIKE_STMTS[search_type], ('%' + name + '%',))
+            return cursor.fetchall(), False
+    except mariadb.DataError as e:
+        logging.error(f"Error searching for {search_type} from the database: {e}")
+        return None, False
 
-    return data
 
+def _search_cached(search_type: str, name: str) -> tuple or None:
+    cached = search_cache.get(name, [search_type])
+    if search_type in cached:
+        return cached[search_type]
 
-def search_movies(name: str) -> tuple or None:
-    search_stmt = "SELECT * FROM Movie WHERE title LIKE ? LIMIT 30"
-    term_data = handler.find_documents(config.get('MONGODB', 'SEARCH_CACHE_COLLECTION'),
-                                       {'term': name, 'type': 'movies'})
+    data, indexed = _search(search_type, name)
+    if data is None:
+        return None
 
-    if term_data:
-        data = term_data[0]['data']
-        if data:
-            return data
+    if indexed:
+        search_cache.set(name, {search_type: data})
 
-    try:
-        cursor.execute(search_stmt, ('%' + name + '%',))
-    except mariadb.DataError as e:
-        logging.error(f"Error searching for movies from the database: {e}")
-        return None
+    return data
 
-    data = cursor.fetchall()
 
-    if not data:
-        return []
+def search_directors(name: str) -> tuple or None:
+    return _search_cached('directors', name)
 
-    handler.insert_document(config.get('MONGODB', 'SEARCH_CACHE_COLLECTION'),
-                            {'term': name, 'type': 'movies', 'data': data})
 
-    return data
+def search_movies(name: str) -> tuple or None:
+    return _search_cached('movies', name)
 
 
 def search_actors(name: str) -> tuple or None:
-    search_stmt = "SELECT * FROM Actor WHERE actor_name LIKE ? LIMIT 30"
-    term_data = handler.find_documents(config.get('MONGODB', 'SEARCH_CACHE_COLLECTION'),
-                                       {'term': name, 'type': 'actors'})
+    return _search_cached('actors', name)
 
-    if term_data:
-        data = term_data[0]['data']
-        if data:
-            return data
 
-    try:
-        cursor.execute(search_stmt, ('%' + name + '%',))
-    except mariadb.DataError as e:
-        logging.error(f"Error searching for actors from the database: {e}")
-        return None
+def search_catalog(name: str) -> dict:
+    """
+    Search movies, actors and directors at once, with a single search cache lookup for all three
+    :param name: Search term
+    :return: Dictionary of "movies", "actors" and "directors" to their results
+    """
+    search_types = list(LIKE_STMTS)
+    results = search_cache.get(name, search_types)
 
-    data = cursor.fetchall()
+    new_results = {}
+    for search_type in search_types:
+        if search_type not in results:
+            data, indexed = _search(search_type, name)
+            results[search_type] = data or []
+            if indexed:
+                new_results[search_type] = results[search_type]
 
-    if not data:
-        return []
+    search_cache.set(name, new_results)
+    return results
 
-    handler.insert_document(config.get('MONGODB', 'SEARCH_CACHE_COLLECTION'),
-                            {'term': name, 'type': 'actors', 'data': data})
-
-    return data
 
 # def get_movieID(title: str) -> int | None:
 #     stmt = "SELECT movie_id " \
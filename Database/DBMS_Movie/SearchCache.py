@@ -0,0 +1,108 @@
+####################################################################################################
+# Search results cached in MongoDB. Terms are normalized (case, whitespace, accents, punctuation)  #
+# so different spellings of one search share an entry, entries expire through a TTL index and the  #
+# collection is capped in size. Any catalog write can change any result, so it clears the cache.   #
+####################################################################################################
+import datetime
+import logging
+import threading
+
+from .Events import on_catalog_change
+from .Movie import config, handler
+from .SearchIndex import tokenize
+
+
+def cache_key(term: str) -> str:
+    """
+    Normalize a search term, e.g. "  Amélie " and "amelie" share a key
+    :param term: Search term
+    :return: Cache key
+    """
+    return ' '.join(tokenize(term))
+
+
+def _serialize(rows: list) -> list[list]:
+    # BSON has no date type without a time, store dates as they are displayed
+    return [[str(value) if isinstance(value, datetime.date) else value for value in row] for row in rows]
+
+
+class SearchCache:
+    """
+    Search results per (normalized term, search type)
+    """
+
+    def __init__(self, collection: str, ttl: int = 3600, max_entries: int = 10000):
+        """
+        :param collection: MongoDB collection
+        :param ttl: Seconds before an entry expires
+        :param max_entries: Maximum number of entries, the oldest are removed beyond this
+        """
+        self.collection = collection
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._indexed = False
+        self._lock = threading.Lock()
+
+    def _ensure_indexes(self) -> None:
+        with self._lock:
+            if self._indexed:
+                return
+            # Entries from before terms were normalized have no key and would never expire
+            handler.delete_documents(self.collection, {'key': {'$exists': False}}, many=True)
+            handler.create_index(self.collection, [('key', 1), ('type', 1)], unique=True)
+            handler.create_index(self.collection, 'created_at', expireAfterSeconds=self.ttl)
+            self._indexed = True
+
+    def get(self, term: str, search_types: list[str]) -> dict:
+        """
+        Get the cached results of a term
+        :param term: Search term
+        :param search_types: Types to look up, e.g. ["movies", "actors"]
+        :return: Dictionary of search type to results, only for cached types
+        """
+        self._ensure_indexes()
+        key = cache_key(term)
+        if not key:
+            return {}
+
+        documents = handler.find_documents(self.collection, {'key': key, 'type': {'$in': search_types}}, 0) or []
+        # The TTL monitor only runs every minute, skip entries that expired since
+        oldest = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.ttl)
+        return {document['type']: document['data'] for document in documents
+                if document.get('data') and document.get('created_at', oldest) > oldest}
+
+    def set(self, term: str, results: dict) -> None:
+        """
+        Cache the results of a term, empty results are not cached
+        :param term: Search term
+        :param results: Dictionary of search type to results
+        """
+        self._ensure_indexes()
+        key = cache_key(term)
+        if not key:
+            return
+
+        now = datetime.datetime.utcnow()
+        updates = [({'key': key, 'type': search_type},
+                    {'key': key, 'type': search_type, 'data': _serialize(data), 'created_at': now})
+                   for search_type, data in results.items() if data]
+        if updates:
+            handler.upsert_documents(self.collection, updates)
+            handler.trim_collection(self.collection, self.max_entries, 'created_at')
+
+    def clear(self) -> None:
+        handler.delete_documents(self.collection, {}, many=True)
+        logging.info("Search cache cleared")
+
+
+search_cache = SearchCache(
+    config.get('MONGODB', 'SEARCH_CACHE_COLLECTION'),
+    ttl=config.getint('SEARCH', 'CACHE_TTL', fallback=3600),
+    max_entries=config.getint('SEARCH', 'CACHE_MAX_ENTRIES', fallback=10000)
+)
+
+
+@on_catalog_change
+def _clear_search_cache(action: str, movie_id: int = None, title: str = None) -> None:
+    if action != "refresh":
+        search_cache.clear()
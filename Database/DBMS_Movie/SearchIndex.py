@@ -0,0 +1,398 @@
+####################################################################################################
+# In-process full-text search over the Movie, Actor and Director tables.                          #
+# Every name is split into lowercase, accent-free tokens and kept in an inverted index (token ->   #
+# row ids) next to a sorted token list, so a search is a few dictionary and bisect lookups         #
+# instead of a LIKE '%term%' scan. The indexes are rebuilt from the database by a background       #
+# thread and kept up to date between rebuilds by the catalog hooks.                                #
+####################################################################################################
+import bisect
+import heapq
+import logging
+import re
+import threading
+import unicodedata
+
+from .Events import on_catalog_change
+from .Movie import config, pool
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercase text and strip accents, e.g. "Amélie" -> "amelie"
+    :param text: Text to normalize
+    :return: Normalized text
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into normalized word tokens
+    :param text: Text to split
+    :return: List of tokens
+    """
+    return _TOKEN.findall(normalize(text))
+
+
+def rank(rows: list[tuple], term: str, name_column: int = 1) -> list[tuple]:
+    """
+    Order rows found by another store (e.g. a LIKE query) the way SearchIndex ranks its results
+    :param rows: Rows to order
+    :param term: Search term
+    :param name_column: Index of the column that was searched
+    :return: Rows, best matches first
+    """
+    tokens = tokenize(term)
+    phrase = ' '.join(tokens)
+
+    def score(row: tuple) -> tuple:
+        name_tokens = tokenize(row[name_column])
+        name = ' '.join(name_tokens)
+        points = sum(2 if token in name_tokens else 1 if any(word.startswith(token) for word in name_tokens) else 0
+                     for token in tokens)
+        if name == phrase:
+            points += 10
+        elif name.startswith(phrase):
+            points += 5
+        return -points, len(name), name
+
+    return sorted(rows, key=score)
+
+
+class PrefixIndex:
+    """
+    Sorted arrays of every word-suffix of every name ("the dark knight", "dark knight", "knight"),
+    so the names starting with a prefix, or with a word starting with it, are one bisect away.
+    Whole names and later-word suffixes are kept apart, so the whole-name matches of a short prefix
+    are found without scanning past every later-word match.
+
+    Not thread-safe, SearchIndex guards it with its own lock.
+    """
+
+    def __init__(self):
+        # (name, row id), sorted
+        self._whole = []
+        # (suffix, row id, position of the suffix's first word in the name), sorted, position > 0
+        self._later = []
+
+    @staticmethod
+    def _suffixes(row_id, name: str) -> list[tuple]:
+        tokens = tokenize(name)
+        return [(' '.join(tokens[position:]), row_id, position) for position in range(len(tokens))]
+
+    def build(self, names: dict) -> None:
+        """
+        :param names: Row id -> name
+        """
+        keys = [key for row_id, name in names.items() for key in self._suffixes(row_id, name)]
+        self._whole = sorted((suffix, row_id) for suffix, row_id, position in keys if position == 0)
+        self._later = sorted(key for key in keys if key[2] > 0)
+
+    def add(self, row_id, name: str) -> None:
+        for suffix, row_id, position in self._suffixes(row_id, name):
+            if position == 0:
+                bisect.insort(self._whole, (suffix, row_id))
+            else:
+                bisect.insort(self._later, (suffix, row_id, position))
+
+    def remove(self, row_id, name: str) -> None:
+        for suffix, row_id, position in self._suffixes(row_id, name):
+            keys, key = (self._whole, (suffix, row_id)) if position == 0 else (self._later, (suffix, row_id, position))
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    @staticmethod
+    def _starting_with(keys: list, prefix: str):
+        for i in range(bisect.bisect_left(keys, (prefix,)), len(keys)):
+            if not keys[i][0].startswith(prefix):
+                return
+            yield keys[i]
+
+    def lookup(self, prefix: str, limit: int, names: dict) -> list[tuple]:
+        """
+        Best matches of a prefix, every match is ranked so none is cut off before ranking
+        :param prefix: Normalized prefix
+        :param limit: Maximum number of matches
+        :param names: Row id -> normalized name, for the length of names matched by a later word
+        :return: List of ((later word, length of the name, name), row id), names starting with the prefix first,
+                 then names with a later word starting with it, shorter names first
+        """
+        best = heapq.nsmallest(limit, (((False, len(name), name), row_id)
+                                       for name, row_id in self._starting_with(self._whole, prefix)))
+        if len(best) < limit:
+            seen = {row_id for _, row_id in best}
+            later = {row_id for _, row_id, _ in self._starting_with(self._later, prefix)} - seen
+            best += heapq.nsmallest(limit - len(best), (((True, len(names[row_id]), names[row_id]), row_id)
+                                                        for row_id in later))
+        return best
+
+
+class SearchIndex:
+    """
+    Inverted index of the names of one table, rows are kept as selected so results have the table's columns
+    """
+
+    def __init__(self, name: str, stmt: str, name_column: int = 1):
+        """
+        :param name: Name of the index, for logging
+        :param stmt: SELECT of every row, the first column is the row id
+        :param name_column: Index of the column that is searched
+        """
+        self.name = name
+        self.stmt = stmt
+        self.name_column = name_column
+        self._lock = threading.Lock()
+        self._rows = {}
+        # Row id -> the name's tokens joined by spaces, for ranking whole-name matches
+        self._names = {}
+        self._postings = {}
+        self._tokens = []
+        self._prefixes = PrefixIndex()
+
+    def build(self, rows: list[tuple]) -> None:
+        """
+        Replace the index with the given rows
+        """
+        postings = {}
+        names = {}
+        for row in rows:
+            names[row[0]] = ' '.join(tokenize(row[self.name_column]))
+            for token in set(tokenize(row[self.name_column])):
+                postings.setdefault(token, set()).add(row[0])
+
+        prefixes = PrefixIndex()
+        prefixes.build(names)
+
+        with self._lock:
+            self._rows = {row[0]: tuple(row) for row in rows}
+            self._names = names
+            self._postings = postings
+            self._tokens = sorted(postings)
+            self._prefixes = prefixes
+        logging.info(f"Search index {self.name} built with {len(rows)} rows and {len(postings)} tokens")
+
+    def add(self, row: tuple) -> None:
+        """
+        Add a row, or replace it if its id is already indexed
+        """
+        with self._lock:
+            self._remove(row[0])
+            self._rows[row[0]] = tuple(row)
+            self._names[row[0]] = ' '.join(tokenize(row[self.name_column]))
+            self._prefixes.add(row[0], row[self.name_column])
+            for token in set(tokenize(row[self.name_column])):
+                ids = self._postings.get(token)
+                if ids is None:
+                    ids = self._postings[token] = set()
+                    bisect.insort(self._tokens, token)
+                ids.add(row[0])
+
+    def remove(self, row_id) -> None:
+        with self._lock:
+            self._remove(row_id)
+
+    def _remove(self, row_id) -> None:
+        # Called with self._lock held
+        row = self._rows.pop(row_id, None)
+        self._names.pop(row_id, None)
+        if row is None:
+            return
+
+        self._prefixes.remove(row_id, row[self.name_column])
+        for token in set(tokenize(row[self.name_column])):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(row_id)
+            if not ids:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+    def _prefix_matches(self, token: str) -> dict:
+        # Called with self._lock held, row id -> 2 if a word of the name is the token, 1 if it starts with it
+        matches = {}
+        start = bisect.bisect_left(self._tokens, token)
+        for indexed in self._tokens[start:]:
+            if not indexed.startswith(token):
+                break
+            score = 2 if indexed == token else 1
+            for row_id in self._postings[indexed]:
+                if matches.get(row_id, 0) < score:
+                    matches[row_id] = score
+        return matches
+
+    def search(self, term: str, limit: int = 30) -> list[tuple]:
+        """
+        Find the rows whose name has a word starting with every word of the term, best matches first.
+
+        Exact words rank above prefixes, and a name equal to or starting with the whole term ranks first.
+        :param term: Search term
+        :param limit: Maximum number of rows
+        :return: List of rows
+        """
+        tokens = list(dict.fromkeys(tokenize(term)))
+        if not tokens:
+            return []
+        phrase = ' '.join(tokens)
+
+        with self._lock:
+            scores = None
+            # Most selective (longest) token first, so the intersection shrinks quickly
+            for token in sorted(tokens, key=len, reverse=True):
+                matches = self._prefix_matches(token)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {row_id: score + matches[row_id] for row_id, score in scores.items() if row_id in matches}
+                if not scores:
+                    return []
+
+            ranked = []
+            for row_id, score in scores.items():
+                name = self._names[row_id]
+                if name == phrase:
+                    score += 10
+                elif name.startswith(phrase):
+                    score += 5
+                ranked.append((-score, len(name), name, row_id))
+
+            ranked.sort()
+            return [self._rows[row_id] for *_, row_id in ranked[:limit]]
+
+    def complete(self, prefix: str, limit: int = 10) -> list[tuple]:
+        """
+        Autocomplete a name: names starting with the prefix first, then names with a later word starting with it,
+        shorter names first
+        :param prefix: Text typed so far
+        :param limit: Maximum number of rows
+        :return: List of (rank, row), ranks of different indexes can be compared
+        """
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+
+        with self._lock:
+            return [(rank, self._rows[row_id]) for rank, row_id in self._prefixes.lookup(prefix, limit, self._names)]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class CatalogSearch:
+    """
+    Search indexes of movies, actors and directors, rebuilt in the background
+    """
+
+    def __init__(self, rebuild_interval: int = 3600):
+        """
+        :param rebuild_interval: Seconds between full rebuilds from the database
+        """
+        self.rebuild_interval = rebuild_interval
+        self.movies = SearchIndex("movies", "SELECT movie_id, title, release_date, synopsis, tmdb_id FROM Movie")
+        self.actors = SearchIndex("actors", "SELECT actor_id, actor_name, tmdb_id FROM Actor")
+        self.directors = SearchIndex("directors", "SELECT director_id, director_name, tmdb_id FROM Director")
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def rebuild(self) -> None:
+        """
+        Rebuild every index from the database
+        """
+        for index in (self.movies, self.actors, self.directors):
+            with pool.cursor() as cursor:
+                cursor.execute(index.stmt)
+                rows = cursor.fetchall()
+            index.build(rows)
+        self._ready.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.rebuild()
+            except Exception as e:
+                logging.error(f"Error rebuilding search indexes: {e}")
+            self._wake.wait(self.rebuild_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """
+        Start the background rebuild thread if it isn't running
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="catalog-search", daemon=True)
+                self._thread.start()
+
+    def ready(self, timeout: float = None) -> bool:
+        """
+        Wait for the first build, starting it if needed
+        :param timeout: Seconds to wait, None to wait until built
+        :return: True if the indexes are built
+        """
+        self.start()
+        return self._ready.wait(timeout)
+
+    def invalidate(self) -> None:
+        """
+        Rebuild as soon as possible
+        """
+        self._wake.set()
+
+    def catalog_changed(self, action: str, movie_id: int = None) -> None:
+        """
+        Apply a catalog change to the indexes
+        :param action: "insert", "update", "delete" or "refresh"
+        :param movie_id: Id of the movie that changed
+        """
+        # Metadata refreshes don't change names, and changes before the first build are part of the build
+        if action == "refresh" or not self._ready.is_set():
+            return
+        if movie_id is None:
+            self.invalidate()
+        elif action == "delete":
+            self.movies.remove(movie_id)
+        else:
+            self.index_movie(movie_id)
+
+    def index_movie(self, movie_id: int) -> None:
+        """
+        (Re)index a movie and its cast and directors
+        :param movie_id: Movie id
+        """
+        with pool.cursor() as cursor:
+            cursor.execute(self.movies.stmt + " WHERE movie_id = ?", (movie_id,))
+            movie = cursor.fetchone()
+            cursor.execute("SELECT DISTINCT Actor.actor_id, Actor.actor_name, Actor.tmdb_id "
+                           "FROM Actor INNER JOIN Movie_Actor ON Actor.actor_id = Movie_Actor.actor_id "
+                           "WHERE Movie_Actor.movie_id = ?", (movie_id,))
+            actors = cursor.fetchall()
+            cursor.execute("SELECT DISTINCT Director.director_id, Director.director_name, Director.tmdb_id "
+                           "FROM Director INNER JOIN Movie_Director ON Director.director_id = Movie_Director.director_id "
+                           "WHERE Movie_Director.movie_id = ?", (movie_id,))
+            directors = cursor.fetchall()
+
+        if movie is None:
+            self.movies.remove(movie_id)
+            return
+
+        self.movies.add(movie)
+        for actor in actors:
+            self.actors.add(actor)
+        for director in directors:
+            self.directors.add(director)
+
+
+catalog_search = CatalogSearch(
+    rebuild_interval=config.getint('SEARCH', 'INDEX_REBUILD_INTERVAL', fallback=3600)
+)
+
+
+@on_catalog_change
+def _update_search_index(action: str, movie_id: int = None, title: str = None) -> None:
+    catalog_search.catalog_changed(action, movie_id)
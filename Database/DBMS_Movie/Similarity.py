@@ -0,0 +1,170 @@
+####################################################################################################
+# Item-to-item movie similarity, built offline.                                                    #
+# Every movie is a sparse vector of its genres, top-billed actors and director, weighted by how   #
+# rare each feature is (IDF) and normalized, so the dot product of two movies is their cosine      #
+# similarity. The top K neighbours of every movie are computed in blocks of rows with sparse       #
+# matrix products and stored in MongoDB, serving "because you saved X" is then one keyed lookup.   #
+# Run from the project root: python -m Database.DBMS_Movie.Similarity                              #
+####################################################################################################
+import argparse
+import datetime
+import logging
+
+from .Movie import config, handler, pool
+
+SIMILAR_MOVIES_COLLECTION = config.get('MONGODB', 'SIMILAR_MOVIES_COLLECTION', fallback='similar_movies')
+
+
+def load_features(max_cast: int = 10) -> tuple[list[int], dict[int, list[tuple]]]:
+    """
+    Load the features of every movie from the database
+    :param max_cast: Only the first max_cast actors of a movie (by billing order, then actor id) are features
+    :return: Movie ids, movie id -> features such as ('genre', 28), ('actor', 12) or ('director', 3)
+    """
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT movie_id FROM Movie")
+        movie_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT movie_id, genre_id FROM Movie_Genre")
+        genres = cursor.fetchall()
+        # Movies added before the billing order was stored have NULL billing orders, their actors come last
+        cursor.execute("SELECT movie_id, actor_id FROM ("
+                       "SELECT movie_id, actor_id, ROW_NUMBER() OVER ("
+                       "PARTITION BY movie_id ORDER BY COALESCE(billing_order, 1e9), actor_id) AS position "
+                       "FROM Movie_Actor) AS Billed "
+                       "WHERE position <= ?", (max_cast,))
+        actors = cursor.fetchall()
+        cursor.execute("SELECT movie_id, director_id FROM Movie_Director")
+        directors = cursor.fetchall()
+
+    features = {movie_id: [] for movie_id in movie_ids}
+    for kind, rows in (('genre', genres), ('actor', actors), ('director', directors)):
+        for movie_id, feature_id in rows:
+            if movie_id in features:
+                features[movie_id].append((kind, feature_id))
+    return movie_ids, features
+
+
+def feature_matrix(movie_ids: list[int], features: dict[int, list[tuple]]):
+    """
+    Build the normalized TF-IDF matrix of the movies
+    :param movie_ids: Movie ids, one row each
+    :param features: Movie id -> features
+    :return: scipy.sparse CSR matrix (movies x features) with unit-length rows
+    """
+    import numpy as np
+    from scipy import sparse
+
+    columns = {}
+    rows, cols = [], []
+    for row, movie_id in enumerate(movie_ids):
+        for feature in set(features[movie_id]):
+            rows.append(row)
+            cols.append(columns.setdefault(feature, len(columns)))
+
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(movie_ids), len(columns)))
+
+    # Rare features (an actor) say more about a movie than common ones (Drama)
+    document_frequency = np.bincount(cols, minlength=len(columns))
+    idf = np.log((1 + len(movie_ids)) / (1 + document_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+
+def nearest_neighbours(matrix, k: int = 20, block_size: int = 512) -> list[list[tuple[int, float]]]:
+    """
+    Top k most similar rows of every row
+    :param matrix: Normalized CSR matrix from feature_matrix()
+    :param k: Neighbours per row
+    :param block_size: Rows multiplied at a time, bounds the memory to block_size x rows similarities
+    :return: For every row, (row, similarity) of its neighbours, most similar first
+    """
+    import numpy as np
+
+    count = matrix.shape[0]
+    k = min(k, count - 1)
+    transposed = matrix.T.tocsc()
+    neighbours = []
+    for start in range(0, count, block_size):
+        end = min(start + block_size, count)
+        similarities = (matrix[start:end] @ transposed).toarray()
+        # A movie is not its own neighbour
+        similarities[np.arange(end - start), np.arange(start, end)] = 0
+
+        if k <= 0:
+            neighbours.extend([] for _ in range(end - start))
+            continue
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for row_top, row_scores in zip(top, top_scores):
+            neighbours.append([(int(row), float(score)) for row, score in zip(row_top, row_scores) if score > 0])
+    return neighbours
+
+
+def build_similarities(k: int = 20, max_cast: int = 10) -> int:
+    """
+    Recompute the top k neighbours of every movie and store them in MongoDB
+    :param k: Neighbours per movie
+    :param max_cast: Actors per movie used as features
+    :return: Number of movies stored
+    """
+    movie_ids, features = load_features(max_cast)
+    if not movie_ids:
+        return 0
+
+    neighbours = nearest_neighbours(feature_matrix(movie_ids, features), k)
+
+    now = datetime.datetime.utcnow()
+    updates = [({'_id': movie_id},
+                {'neighbours': [[movie_ids[row], round(score, 4)] for row, score in movie_neighbours],
+                 'built_at': now})
+               for movie_id, movie_neighbours in zip(movie_ids, neighbours)]
+    for start in range(0, len(updates), 1000):
+        handler.upsert_documents(SIMILAR_MOVIES_COLLECTION, updates[start:start + 1000])
+    # Movies deleted since the last build
+    handler.delete_documents(SIMILAR_MOVIES_COLLECTION, {'_id': {'$nin': movie_ids}}, many=True)
+
+    logging.info(f"Similar movies built for {len(updates)} movies")
+    return len(updates)
+
+
+def similar_movies(movie_id: int) -> list[tuple[int, float]]:
+    """
+    Most similar movies of a movie, from the last build
+    :param movie_id: Movie ID
+    :return: List of (movie_id, similarity), most similar first, empty if not built yet
+    """
+    data = handler.find_cached(SIMILAR_MOVIES_COLLECTION, {'_id': int(movie_id)})
+    if not data:
+        return []
+    return [(neighbour, score) for neighbour, score in data[0].get('neighbours', [])]
+
+
+def parse_args() -> None:
+    """
+    Parse command line arguments
+    -k: Neighbours per movie
+    --max-cast: Actors per movie used as features
+    :return: None
+    """
+    parser = argparse.ArgumentParser(
+        description="Build the similar movies used by the recommendations.",
+        prog="python -m Database.DBMS_Movie.Similarity"
+    )
+
+    parser.add_argument("-k", type=int, default=20, help="Neighbours per movie (default: 20)")
+    parser.add_argument("--max-cast", type=int, default=10, help="Actors per movie used as features (default: 10)")
+
+    args = parser.parse_args()
+    count = build_similarities(k=args.k, max_cast=args.max_cast)
+    print(f"[+] Similar movies built for {count} movies")
+
+
+if __name__ == "__main__":
+    parse_args()
@@ -32,7 +32,17 @@ if config.get('TMDB', 'API_KEY') == "":
     raise ValueError("Please enter your TMDB API key in the config.ini file")
 
 from .Movie import *
+from .Carousel import *
+from .Similarity import *
+from .Recommendation import *
 from .Actor import *
 from .Director import *
+from .SearchIndex import *
+from .SearchCache import *
+from .Autocomplete import *
 from .Search import *
+from .Analytics import *
+from .ReviewStats import *
 from .Admin import *
+from .Ingest import *
+from .Refresher import *
@@ -29,20 +29,41 @@ create table if not exists Movie
         primary key,
     title        varchar(255) not null,
     release_date date         not null,
-    synopsis     text         not null
+    synopsis     text         not null,
+    tmdb_id      int          null
 );
 
+-- Databases created before tmdb_id was added, fill it in with Backfill.py
+alter table Movie
+    add column if not exists tmdb_id int null;
+
+create index if not exists tmdb_id
+    on Movie (tmdb_id);
+
+-- check_movie looks movies up by title
+create index if not exists title
+    on Movie (title);
+
+-- Keyset pagination of the home and genre listings (newest first)
+create index if not exists release_date_movie_id
+    on Movie (release_date, movie_id);
+
 create table if not exists Movie_Actor
 (
     movie_id        int  not null,
     actor_id        int  not null,
     movie_character text not null,
+    billing_order   int  null,
     constraint Movie_Actor_ibfk_1
         foreign key (movie_id) references Movie (movie_id),
     constraint Movie_Actor_ibfk_2
         foreign key (actor_id) references Actor (actor_id)
 );
 
+-- Position in the TMDB cast list, NULL for movies added before it was recorded
+alter table Movie_Actor
+    add column if not exists billing_order int null;
+
 create index if not exists actor_id
     on Movie_Actor (actor_id);
 
@@ -77,3 +98,50 @@ create table if not exists Movie_Genre
 create index if not exists genre_id
     on Movie_Genre (genre_id);
 
+create index if not exists genre_id_movie_id
+    on Movie_Genre (genre_id, movie_id);
+
+-- Natural keys: actors and directors are identified by their TMDB id.
+-- Databases created before the unique keys existed can have duplicates (new_movie used to insert the
+-- director before checking for it), merge them into the lowest id before adding the keys.
+update Movie_Actor
+    inner join Actor on Movie_Actor.actor_id = Actor.actor_id
+    inner join (select tmdb_id, min(actor_id) as actor_id from Actor group by tmdb_id having count(*) > 1) as keep
+        on Actor.tmdb_id = keep.tmdb_id
+set Movie_Actor.actor_id = keep.actor_id;
+
+delete Actor
+from Actor
+    inner join (select tmdb_id, min(actor_id) as actor_id from Actor group by tmdb_id having count(*) > 1) as keep
+        on Actor.tmdb_id = keep.tmdb_id and Actor.actor_id <> keep.actor_id;
+
+-- A movie can already be linked to both copies of a director, keep one link
+update ignore Movie_Director
+    inner join Director on Movie_Director.director_id = Director.director_id
+    inner join (select tmdb_id, min(director_id) as director_id from Director group by tmdb_id having count(*) > 1) as keep
+        on Director.tmdb_id = keep.tmdb_id
+set Movie_Director.director_id = keep.director_id;
+
+delete Movie_Director
+from Movie_Director
+    inner join Director on Movie_Director.director_id = Director.director_id
+    inner join (select tmdb_id, min(director_id) as director_id from Director group by tmdb_id having count(*) > 1) as keep
+        on Director.tmdb_id = keep.tmdb_id and Director.director_id <> keep.director_id;
+
+delete Director
+from Director
+    inner join (select tmdb_id, min(director_id) as director_id from Director group by tmdb_id having count(*) > 1) as keep
+        on Director.tmdb_id = keep.tmdb_id and Director.director_id <> keep.director_id;
+
+create unique index if not exists tmdb_id
+    on Actor (tmdb_id);
+
+create unique index if not exists tmdb_id
+    on Director (tmdb_id);
+
+-- check_actor and check_director look people up by name
+create index if not exists actor_name
+    on Actor (actor_name);
+
+create index if not exists director_name
+    on Director (director_name);
@@ -1,29 +1,22 @@
 ####################################################################################################
-# This class is to create and maintain a connection to the database. It is a singleton class,      #
-# meaning that only one instance of this class can exist at a time. This is to prevent multiple    #
-# connections to the database being created.                                                       #
+# This class is to create and maintain a pool of connections to the database. It is a singleton    #
+# class, meaning that only one pool exists per process. Each request checks out one connection on  #
+# first use and returns it when the request ends.                                                  #
 ####################################################################################################
 import configparser
 import sys
 import mariadb
 import logging
 
+from Database.ConnectionPool import ConnectionPool
 
-class UserDBConnection:
+
+class UserDBConnectionPool(ConnectionPool):
     """
-    Singleton class to create a connection to the database
+    Singleton pool of connections to the DBMS_User database
     """
     _instance = None
-
-    def __new__(cls) -> object:
-        """
-        Create a new instance of the class if it doesn't exist, otherwise return the existing instance
-        """
-        if not cls._instance:
-            cls._instance = super().__new__(cls)
-            cls._instance.connection = cls._instance._create_connection()
-            cls._instance.cursor = cls._instance.connection.cursor()
-        return cls._instance
+    section = 'DBMS_USER'
 
     def _create_connection(self) -> mariadb.Connection:
         """
@@ -94,11 +87,3 @@ class UserDBConnection:
         except mariadb.OperationalError as e:
             logging.error(f"Error connecting to MariaDB Platform: {e}")
             sys.exit(1)
-
-    def close_connection(self) -> None:
-        """
-        Close the connection to the database
-        :return: None
-        """
-        self.cursor.close()
-        self.connection.close()
@@ -0,0 +1,264 @@
+####################################################################################################
+# Application-wide thread pool for fanning out calls to TMDB and MongoDB. Every upstream has its   #
+# own concurrency limit, tasks over the limit wait in a per-upstream queue instead of holding a    #
+# worker, so a burst of TMDB calls can't starve the rest. Queue depth and latency are tracked per  #
+# upstream, see stats(), and the pool is shut down when the interpreter exits. RateLimiter caps    #
+# the rate of calls to an upstream, for jobs that make many calls in a row. Those jobs run under   #
+# tmdb_bulk, so a task waiting for the rate limiter never holds one of the request path's slots.   #
+####################################################################################################
+import atexit
+import configparser
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class RateLimiter:
+    """
+    Token bucket, allows bursts of up to `burst` calls and `rate` calls per second on average
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        """
+        :param rate: Calls per second
+        :param burst: Calls allowed at once, defaults to rate
+        """
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """
+        Block until a call is allowed
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class ExecutorService:
+    """
+    Shared bounded executor, one per process
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Upstreams with a concurrency limit, read from [EXECUTOR] <UPSTREAM>_MAX_CONCURRENCY
+    # tmdb_bulk is TMDB for rate-limited background jobs (imports, refreshes), tmdb for requests
+    upstreams = ('tmdb', 'tmdb_bulk', 'mongo')
+
+    def __new__(cls) -> object:
+        """
+        Create the executor if it doesn't exist, otherwise return the existing executor
+        """
+        with cls._instance_lock:
+            if not cls._instance:
+                instance = super().__new__(cls)
+                instance._init_executor()
+                cls._instance = instance
+        return cls._instance
+
+    def _init_executor(self) -> None:
+        """
+        Read the executor configuration and register the shutdown at exit
+        """
+        from Config.ConfigManager import ConfigManager
+
+        config = ConfigManager().get_config()
+
+        try:
+            self.max_workers = config.getint('EXECUTOR', 'MAX_WORKERS', fallback=16)
+            self.limits = {
+                upstream: config.getint('EXECUTOR', f'{upstream.upper()}_MAX_CONCURRENCY', fallback=8)
+                for upstream in self.upstreams
+            }
+        except (configparser.Error, ValueError) as e:
+            logging.error(f"Error reading executor configuration: {e}")
+            raise e
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="executor")
+        self._lock = threading.Lock()
+        # Tasks waiting for a free slot of their upstream
+        self._pending = {upstream: deque() for upstream in self.limits}
+        self._active = {upstream: 0 for upstream in self.limits}
+        # Inline tasks (submitted from a worker) waiting for a free slot, they get freed slots before queued tasks
+        # because they hold a worker thread while they wait
+        self._slot_freed = threading.Condition(self._lock)
+        self._waiting = {upstream: 0 for upstream in self.limits}
+        self._metrics = {}
+        # Set in worker threads, tasks submitted from a worker run inline so a full pool can't deadlock
+        self._local = threading.local()
+        self._shutdown = False
+
+        atexit.register(self.shutdown)
+        logging.info(f"Executor ready: workers={self.max_workers}, limits={self.limits}")
+
+    def _upstream_metrics(self, upstream: str) -> dict:
+        # Called with self._lock held
+        metrics = self._metrics.get(upstream)
+        if metrics is None:
+            metrics = self._metrics[upstream] = {
+                'submitted': 0, 'completed': 0, 'failed': 0, 'queued': 0, 'running': 0,
+                'wait_time': 0.0, 'run_time': 0.0, 'max_run_time': 0.0,
+            }
+        return metrics
+
+    def submit(self, fn, *args, upstream: str = None, **kwargs) -> Future:
+        """
+        Run fn(*args, **kwargs) in the pool
+
+        :param fn: Function to call
+        :param upstream: "tmdb", "tmdb_bulk" or "mongo" to count the call against that upstream's limit, None for no limit
+        :return: Future of the result
+        """
+        return self._submit(fn, args, kwargs, upstream, inline=getattr(self._local, 'worker', False))
+
+    def submit_background(self, fn, *args, upstream: str = None, **kwargs) -> Future:
+        """
+        Like submit, but always queued, also from inside a worker. For calls nobody waits on, e.g. cache refreshes
+
+        :param fn: Function to call
+        :param upstream: "tmdb", "tmdb_bulk" or "mongo" to count the call against that upstream's limit, None for no limit
+        :return: Future of the result
+        """
+        return self._submit(fn, args, kwargs, upstream, inline=False)
+
+    def _submit(self, fn, args: tuple, kwargs: dict, upstream: str, inline: bool) -> Future:
+        future = Future()
+        task = (future, fn, args, kwargs, time.monotonic())
+
+        # Nested fan-out from inside a worker runs in the caller's thread. It still counts against its upstream's
+        # limit, unless the caller already holds a slot of that upstream (the nested call runs in that slot)
+        if inline:
+            limited = upstream in self.limits and upstream not in getattr(self._local, 'upstreams', ())
+            with self._lock:
+                self._upstream_metrics(upstream)['submitted'] += 1
+                self._upstream_metrics(upstream)['queued'] += 1
+                if limited:
+                    self._waiting[upstream] += 1
+                    while self._active[upstream] >= self.limits[upstream]:
+                        self._slot_freed.wait()
+                    self._waiting[upstream] -= 1
+                    self._active[upstream] += 1
+            self._run(upstream, task, dispatch_next=limited)
+            return future
+
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Executor has been shut down")
+            metrics = self._upstream_metrics(upstream)
+            metrics['submitted'] += 1
+            metrics['queued'] += 1
+            if upstream in self.limits:
+                if self._active[upstream] >= self.limits[upstream]:
+                    self._pending[upstream].append(task)
+                    return future
+                self._active[upstream] += 1
+
+        self._executor.submit(self._run, upstream, task)
+        return future
+
+    def map(self, fn, *iterables, upstream: str = None) -> list:
+        """
+        Like Executor.map, but waits for and returns every result as a list
+
+        :param fn: Function to call
+        :param iterables: Arguments of each call
+        :param upstream: "tmdb", "tmdb_bulk" or "mongo" to count the calls against that upstream's limit
+        :return: Results in the order of the arguments
+        """
+        futures = [self.submit(fn, *args, upstream=upstream) for args in zip(*iterables)]
+        return [future.result() for future in futures]
+
+    def _run(self, upstream: str, task: tuple, dispatch_next: bool = True) -> None:
+        future, fn, args, kwargs, queued_at = task
+        started_at = time.monotonic()
+        with self._lock:
+            metrics = self._upstream_metrics(upstream)
+            metrics['queued'] -= 1
+            metrics['running'] += 1
+            metrics['wait_time'] += started_at - queued_at
+
+        failed = False
+        if future.set_running_or_notify_cancel():
+            was_worker = getattr(self._local, 'worker', False)
+            held = getattr(self._local, 'upstreams', frozenset())
+            self._local.worker = True
+            self._local.upstreams = held | {upstream}
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                failed = True
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                self._local.worker = was_worker
+                self._local.upstreams = held
+
+        run_time = time.monotonic() - started_at
+        next_task = None
+        with self._lock:
+            metrics['running'] -= 1
+            metrics['failed' if failed else 'completed'] += 1
+            metrics['run_time'] += run_time
+            metrics['max_run_time'] = max(metrics['max_run_time'], run_time)
+
+            if dispatch_next and upstream in self.limits:
+                if self._waiting[upstream]:
+                    self._active[upstream] -= 1
+                    self._slot_freed.notify_all()
+                elif self._pending[upstream] and not self._shutdown:
+                    next_task = self._pending[upstream].popleft()
+                else:
+                    self._active[upstream] -= 1
+
+        if next_task is not None:
+            self._executor.submit(self._run, upstream, next_task)
+
+    def stats(self) -> dict:
+        """
+        :return: Per upstream counters, queue depth and average wait/run time in seconds
+        """
+        with self._lock:
+            stats = {}
+            for upstream, metrics in self._metrics.items():
+                finished = metrics['completed'] + metrics['failed']
+                started = finished + metrics['running']
+                stats[upstream or 'default'] = {
+                    **{key: value for key, value in metrics.items() if key not in ('wait_time', 'run_time')},
+                    'limit': self.limits.get(upstream),
+                    'avg_wait_time': metrics['wait_time'] / started if started else 0.0,
+                    'avg_run_time': metrics['run_time'] / finished if finished else 0.0,
+                }
+            return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Cancel tasks waiting for an upstream slot and stop the worker threads
+
+        :param wait: Wait for running tasks to finish
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            pending = [task for tasks in self._pending.values() for task in tasks]
+            for tasks in self._pending.values():
+                tasks.clear()
+
+        for future, *_ in pending:
+            future.cancel()
+        self._executor.shutdown(wait=wait)
+        logging.info(f"Executor shut down: {self.stats()}")
@@ -0,0 +1,26 @@
+####################################################################################################
+# One search across both databases. The catalog search (one search cache lookup in MongoDB, the    #
+# rest from the in-process search indexes) runs on the shared executor while the user search runs #
+# on the request's DBMS_User connection, so a search costs about one round trip per store.         #
+####################################################################################################
+import Database.DBMS_Movie as DBMS_Movie
+import Database.User as DBUser
+from Database.Executor import ExecutorService
+
+executor = ExecutorService()
+
+
+def search_all(term: str) -> dict:
+    """
+    Search movies, actors, directors and user profiles, each ranked by relevance to the term
+    :param term: Search term
+    :return: Dictionary of "movies", "actors", "directors" and "profiles" to their results
+    """
+    catalog = executor.submit(DBMS_Movie.search_catalog, term, upstream='mongo')
+
+    # The user database connection belongs to the request's thread, so this one runs here
+    profiles = DBMS_Movie.rank(DBUser.Database().search_user(term) or [], term, name_column=3)
+
+    results = catalog.result()
+    results['profiles'] = profiles
+    return results
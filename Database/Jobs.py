@@ -0,0 +1,234 @@
+####################################################################################################
+# Background job queue persisted in MongoDB, for work too slow for a request (TMDB imports and     #
+# metadata refreshes). A route enqueues a job and returns, worker threads claim queued jobs        #
+# atomically, failed jobs are retried with exponential backoff, and every job keeps its status,    #
+# attempts and last error so the admin page can show them. A running job's lease is renewed by a   #
+# heartbeat, a job whose worker died (e.g. the process restarted) is picked up again once its     #
+# lease expires.                                                                                   #
+####################################################################################################
+import datetime
+import logging
+import threading
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+import Database.Mongo as Mongo
+from Config.ConfigManager import ConfigManager
+
+config_manager = ConfigManager()
+config = config_manager.get_config()
+
+handler = Mongo.MongoDBHandler.get_instance(
+    config.get('MONGODB', 'CONNECTION_STRING'),
+    config.get('MONGODB', 'DATABASE')
+)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class PermanentJobError(Exception):
+    """
+    Raised by a job function for failures a retry can't fix (e.g. the movie isn't on TMDB), the job fails right away
+    """
+
+
+class JobQueue:
+    """
+    MongoDB backed job queue with worker threads
+    """
+
+    def __init__(self, collection: str, workers: int = 2, max_attempts: int = 5, backoff: int = 30,
+                 lease: int = 600, poll_interval: int = 5):
+        """
+        :param collection: MongoDB collection of the jobs
+        :param workers: Number of worker threads
+        :param max_attempts: Attempts before a job is marked as failed
+        :param backoff: Seconds before the first retry, doubled on every further retry
+        :param lease: Seconds a claimed job may go without a heartbeat before another worker may claim it again,
+                      the lease is renewed every lease / 3 seconds while the job runs
+        :param poll_interval: Seconds between checks for due jobs when idle
+        """
+        self.collection = collection
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._handlers = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def register(self, name: str, function) -> None:
+        """
+        Register the function that runs jobs of a name. Jobs succeed unless the function raises or returns False,
+        and are retried unless it raised PermanentJobError.
+        :param name: Job name
+        :param function: Called with the job's keyword arguments
+        """
+        self._handlers[name] = function
+
+    def enqueue(self, name: str, **kwargs) -> str:
+        """
+        Queue a job
+        :param name: Registered job name
+        :param kwargs: Keyword arguments of the job function, must be storable in MongoDB
+        :return: Job id
+        """
+        if name not in self._handlers:
+            raise ValueError(f"Unknown job {name}")
+
+        now = datetime.datetime.utcnow()
+        job_id = ObjectId()
+        handler.insert_document(self.collection, {
+            '_id': job_id,
+            'name': name,
+            'kwargs': kwargs,
+            'status': QUEUED,
+            'attempts': 0,
+            'run_at': now,
+            'created_at': now,
+            'updated_at': now,
+            'last_error': None,
+            'result': None,
+        })
+        logging.info(f"Queued job {name} {job_id}: {kwargs}")
+        self._wake.set()
+        return str(job_id)
+
+    def _claim(self) -> dict | None:
+        now = datetime.datetime.utcnow()
+        # Identifies this claim, a worker that lost its lease can't renew it or overwrite the new claim's result
+        worker = ObjectId()
+        return handler.find_one_and_update(
+            self.collection,
+            {'$or': [
+                {'status': QUEUED, 'run_at': {'$lte': now}},
+                # The worker running it is gone
+                {'status': RUNNING, 'lease_until': {'$lt': now}},
+            ]},
+            {'$set': {'status': RUNNING, 'started_at': now, 'updated_at': now, 'worker': worker,
+                      'lease_until': now + datetime.timedelta(seconds=self.lease)},
+             '$inc': {'attempts': 1}},
+            sort=[('run_at', ASCENDING)]
+        )
+
+    def _heartbeat(self, job: dict, stop: threading.Event) -> None:
+        # Extend the lease until the job finishes, stop if another worker claimed it meanwhile
+        while not stop.wait(self.lease / 3):
+            now = datetime.datetime.utcnow()
+            renewed = handler.find_one_and_update(
+                self.collection,
+                {'_id': job['_id'], 'worker': job['worker'], 'status': RUNNING},
+                {'$set': {'lease_until': now + datetime.timedelta(seconds=self.lease), 'updated_at': now}}
+            )
+            if renewed is None:
+                logging.warning(f"Job {job['name']} {job['_id']} lost its lease")
+                return
+
+    def _finish(self, job: dict, result=None, error: str = None, retry: bool = True) -> None:
+        now = datetime.datetime.utcnow()
+        if error is None:
+            update = {'status': DONE, 'result': result, 'finished_at': now}
+            logging.info(f"Job {job['name']} {job['_id']} done: {result}")
+        elif retry and job['attempts'] < self.max_attempts:
+            delay = self.backoff * 2 ** (job['attempts'] - 1)
+            update = {'status': QUEUED, 'last_error': error, 'run_at': now + datetime.timedelta(seconds=delay)}
+            logging.warning(f"Job {job['name']} {job['_id']} failed (attempt {job['attempts']}), "
+                            f"retrying in {delay}s: {error}")
+        else:
+            update = {'status': FAILED, 'last_error': error, 'finished_at': now}
+            logging.error(f"Job {job['name']} {job['_id']} failed after {job['attempts']} attempts"
+                          f"{'' if retry else ' (not retryable)'}: {error}")
+
+        update['updated_at'] = now
+        update['lease_until'] = None
+        update['worker'] = None
+        # Only the worker holding the lease may record the outcome
+        finished = handler.find_one_and_update(
+            self.collection,
+            {'_id': job['_id'], 'worker': job['worker'], 'status': RUNNING},
+            {'$set': update}
+        )
+        if finished is None:
+            logging.warning(f"Job {job['name']} {job['_id']} was claimed again before it finished, "
+                            f"its outcome is discarded")
+
+    def run_next(self) -> bool:
+        """
+        Claim and run one due job
+        :return: True if a job was run
+        """
+        job = self._claim()
+        if job is None:
+            return False
+
+        function = self._handlers.get(job['name'])
+        if function is None:
+            self._finish(job, error=f"Unknown job {job['name']}", retry=False)
+            return True
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop),
+                                     name=f"{threading.current_thread().name}-heartbeat", daemon=True)
+        heartbeat.start()
+        retry = True
+        try:
+            result = function(**job.get('kwargs', {}))
+        except PermanentJobError as e:
+            result, error, retry = None, str(e), False
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        else:
+            error = "Job returned False" if result is False else None
+        finally:
+            stop.set()
+            heartbeat.join()
+        self._finish(job, result=None if error else result, error=error, retry=retry)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if self.run_next():
+                    continue
+            except Exception as e:
+                logging.error(f"Error in job worker: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """
+        Start the worker threads if they aren't running
+        """
+        with self._lock:
+            if self._threads:
+                return
+            handler.create_index(self.collection, [('status', ASCENDING), ('run_at', ASCENDING)])
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def list_jobs(self, status: str = None, limit: int = 50) -> list[dict]:
+        """
+        Most recently created jobs
+        :param status: Only jobs with this status
+        :param limit: Maximum number of jobs
+        :return: List of jobs
+        """
+        query = {'status': status} if status else {}
+        return handler.find_documents(self.collection, query, limit, sort=[('created_at', DESCENDING)]) or []
+
+
+job_queue = JobQueue(
+    config.get('MONGODB', 'JOB_COLLECTION', fallback='jobs'),
+    workers=config.getint('JOBS', 'WORKERS', fallback=2),
+    max_attempts=config.getint('JOBS', 'MAX_ATTEMPTS', fallback=5),
+    backoff=config.getint('JOBS', 'RETRY_BACKOFF', fallback=30),
+    lease=config.getint('JOBS', 'LEASE', fallback=600)
+)
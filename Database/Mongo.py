@@ -1,9 +1,11 @@
 import logging
 
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, DESCENDING, ReturnDocument
 from pydantic import BaseModel, ValidationError
 import bleach
 
+from Database.Cache import MetadataCache, MISSING
+
 class MongoDBHandler:
     _instance = None
 
@@ -19,6 +21,8 @@ class MongoDBHandler:
             raise Exception("An instance of MongoDBHandler already exists. Use get_instance() to access it.")
         self.client = MongoClient(connection_string)
         self.db = self.client[database_name]
+        # In-process cache in front of the metadata collections, see find_cached()
+        self.cache = MetadataCache()
 
     def sanitize_input(self, document):
         # Sanitize input using Bleach
@@ -49,16 +53,55 @@ class MongoDBHandler:
         except Exception as e:
             logging.error(f'[-] Error inserting document into database\n {e}')
 
-    def find_documents(self, collection_name, query={}, limit: int = None):
-        # if limit is None, default to 5
+    def find_documents(self, collection_name, query={}, limit: int = None, sort=None):
+        # if limit is None, default to 5, sort is a list of (field, direction)
         if limit is None:
             limit = 5
         try:
             collection = self.db[collection_name]
-            return list(collection.find(query).limit(limit))
+            cursor = collection.find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            return list(cursor.limit(limit))
         except Exception as e:
             logging.error(f'[-] Error retrieving documents from database\n {e}')
 
+    def aggregate(self, collection_name, pipeline):
+        # Run an aggregation pipeline in MongoDB, only its output is sent back
+        try:
+            collection = self.db[collection_name]
+            return list(collection.aggregate(pipeline))
+        except Exception as e:
+            logging.error(f'[-] Error aggregating documents in database\n {e}')
+
+    @staticmethod
+    def cache_key(query):
+        # Queries used with the cache are flat equality matches, e.g. {'title': ...} or {'_id': ...}
+        return tuple(sorted(query.items()))
+
+    def get_cached(self, collection_name, query):
+        # Cached result of find_documents(collection_name, query), or None if not cached
+        documents = self.cache.get(collection_name, self.cache_key(query))
+        return None if documents is MISSING else documents
+
+    def set_cached(self, collection_name, query, documents):
+        self.cache.set(collection_name, self.cache_key(query), documents)
+
+    def invalidate_cached(self, collection_name, query=None):
+        # Drop a cached query, or every cached query of the collection if query is None
+        self.cache.invalidate(collection_name, None if query is None else self.cache_key(query))
+
+    def find_cached(self, collection_name, query):
+        # find_documents with the in-process cache in front, only non-empty results are cached
+        documents = self.get_cached(collection_name, query)
+        if documents is not None:
+            return documents
+
+        documents = self.find_documents(collection_name, query)
+        if documents:
+            self.set_cached(collection_name, query, documents)
+        return documents
+
     def update_document(self, collection_name, query, update_data, option):
         try:
             # Sanitize input
@@ -68,10 +111,90 @@ class MongoDBHandler:
             collection.update_one(query, {option: sanitized_update_data})
         except Exception as e:
             logging.error(f'[-] Error updating document in database\n {e}')
+        self.invalidate_cached(collection_name, query)
 
-    def delete_documents(self, collection_name, query):
+    def find_one_and_update(self, collection_name, query, update, sort=None):
+        # Atomically update the first match and return it as updated, None if nothing matched
         try:
             collection = self.db[collection_name]
-            collection.delete_one(query)
+            return collection.find_one_and_update(query, update, sort=sort, return_document=ReturnDocument.AFTER)
+        except Exception as e:
+            logging.error(f'[-] Error updating document in database\n {e}')
+
+    def upsert_documents(self, collection_name, updates):
+        # Bulk upsert, updates is a list of (query, document) and each document is $set on its match
+        if not updates:
+            return
+        try:
+            collection = self.db[collection_name]
+            collection.bulk_write([UpdateOne(query, {'$set': self.sanitize_input(document)}, upsert=True)
+                                   for query, document in updates], ordered=False)
+        except Exception as e:
+            logging.error(f'[-] Error upserting documents into database\n {e}')
+        for query, _ in updates:
+            self.invalidate_cached(collection_name, query)
+
+    def increment_documents(self, collection_name, updates):
+        # Bulk atomic counters, updates is a list of (query, {field: amount}), missing documents are created from the query
+        if not updates:
+            return
+        try:
+            collection = self.db[collection_name]
+            collection.bulk_write([UpdateOne(query, {'$inc': increments}, upsert=True)
+                                   for query, increments in updates], ordered=False)
+        except Exception as e:
+            logging.error(f'[-] Error incrementing documents in database\n {e}')
+        for query, _ in updates:
+            self.invalidate_cached(collection_name, query)
+
+    def create_unique_index(self, collection_name, field):
+        # Unique index on one field, replacing a non-unique one. Duplicates from before the index existed are
+        # removed, the most recently fetched document is kept
+        try:
+            collection = self.db[collection_name]
+            for index in collection.list_indexes():
+                if dict(index['key']) == {field: 1} and not index.get('unique'):
+                    collection.drop_index(index['name'])
+            duplicates = collection.aggregate([
+                {'$sort': {'fetched_at': DESCENDING}},
+                {'$group': {'_id': f'${field}', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+                {'$match': {'count': {'$gt': 1}}},
+            ], allowDiskUse=True)
+            for duplicate in duplicates:
+                collection.delete_many({'_id': {'$in': duplicate['ids'][1:]}})
+            collection.create_index(field, unique=True)
+        except Exception as e:
+            logging.error(f'[-] Error creating unique index on {collection_name}.{field}\n {e}')
+        self.invalidate_cached(collection_name)
+
+    def create_index(self, collection_name, keys, **kwargs):
+        # keys is a field name or a list of (field, direction), kwargs are passed to pymongo (unique, expireAfterSeconds...)
+        try:
+            return self.db[collection_name].create_index(keys, **kwargs)
+        except Exception as e:
+            logging.error(f'[-] Error creating index on {collection_name}\n {e}')
+
+    def trim_collection(self, collection_name, max_documents: int, sort_field: str):
+        # Keep only the max_documents newest documents by sort_field
+        try:
+            collection = self.db[collection_name]
+            if collection.estimated_document_count() <= max_documents:
+                return
+            oldest_kept = list(collection.find({}, {sort_field: 1}).sort(sort_field, DESCENDING)
+                               .skip(max_documents - 1).limit(1))
+            if oldest_kept:
+                result = collection.delete_many({sort_field: {'$lt': oldest_kept[0][sort_field]}})
+                logging.info(f'Trimmed {result.deleted_count} documents from {collection_name}')
+        except Exception as e:
+            logging.error(f'[-] Error trimming collection {collection_name}\n {e}')
+
+    def delete_documents(self, collection_name, query, many: bool = False):
+        try:
+            collection = self.db[collection_name]
+            if many:
+                collection.delete_many(query)
+            else:
+                collection.delete_one(query)
         except Exception as e:
             logging.error(f'[-] Error deleting document in database\n {e}')
+        self.invalidate_cached(collection_name, query)
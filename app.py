@@ -3,6 +3,8 @@ from flask_login import LoginManager
 
 from routes import *
 from Config.ConfigManager import ConfigManager
+import Database.DBMS_Movie as DBMS_Movie
+from Database.Jobs import job_queue
 
 app = Flask(__name__)
 login_manager = LoginManager()
@@ -26,6 +28,12 @@ def load_user(user_id):
     return None
 
 
+@app.teardown_appcontext
+def release_user_connection(exception=None):
+    # Return the request's DBMS_User connection to the pool
+    DBUser.Database().release()
+
+
 # Error Site Route
 @app.route('/404')
 def error404():
@@ -38,6 +46,19 @@ def page_not_found(e):
     return render_template('404.html'), 404
 
 
+# Unique keys of the cached TMDB metadata, the lookups upsert on them
+DBMS_Movie.create_metadata_indexes()
+
+# Warm up the background caches before the first request
+DBMS_Movie.carousel_pool.start()
+DBMS_Movie.recommendation_engine.start()
+DBMS_Movie.catalog_search.start()
+DBMS_Movie.metadata_refresher.start()
+
+# Run queued admin jobs (imports, metadata refreshes) in the background
+job_queue.start()
+
+
 if __name__ == '__main__':
     app.run(
         host=config.get('FLASK', 'HOST'),
@@ -1,11 +1,12 @@
 import datetime
 from bson import ObjectId
-from flask import render_template, request, redirect, url_for, abort
+from flask import render_template, request, redirect, url_for, abort, jsonify
 from flask_login import current_user
 from . import routes
 import Database.DBMS_Movie as DBMS_Movie
 from Config.ConfigManager import ConfigManager
 from Database import Mongo
+from Database.Jobs import job_queue
 import logging
 from routes import load_stats
 
@@ -34,16 +35,16 @@ def admin():
 @routes.route('/addMovie', methods=['POST'])
 def addMovie():
     try:
-        movie_name = request.form['movie_name'] or None
+        movie_name = request.form['movie_name'].strip() or None
         tmdb_id = request.form['tmdb_id']
         if tmdb_id:
             tmdb_id = int(tmdb_id)
 
-        success = DBMS_Movie.new_movie(movie_name, tmdb_id)
-        if success:
-            logging.info(f"Added {movie_name} to the database.")
+        # TMDB calls take seconds, the movie is added by a job worker
+        if movie_name or tmdb_id:
+            job_queue.enqueue("new_movie", title=movie_name, tmdb_id=tmdb_id or None)
         else:
-            logging.error(f"Failed to add {movie_name} to the database.")
+            logging.error("No movie_name or tmdb_id provided")
 
         return redirect(url_for('routes.admin'))
 
@@ -60,6 +61,41 @@ def addMovie():
         return redirect(url_for('routes.admin'))
 
 
+# import a list of movies, one TMDB id or title per line
+@routes.route('/importMovies', methods=['POST'])
+def importMovies():
+    try:
+        references = [reference for reference in map(DBMS_Movie.parse_reference, request.form['movies'].splitlines())
+                      if reference is not None]
+        if references:
+            job_queue.enqueue("import_movies", references=references)
+    except KeyError as e:
+        logging.error(f"KeyError occurred while importing movies: {e}")
+    except Exception as e:
+        logging.error(f"An error occurred while importing movies: {e}")
+    return redirect(url_for('routes.admin'))
+
+
+# recompute the similar movies used by the recommendations
+@routes.route('/buildSimilarities', methods=['POST'])
+def buildSimilarities():
+    try:
+        job_queue.enqueue("build_similarities")
+    except Exception as e:
+        logging.error(f"An error occurred while queueing the similar movies build: {e}")
+    return redirect(url_for('routes.admin'))
+
+
+# recompute the dashboard statistics from every review
+@routes.route('/rebuildReviewStats', methods=['POST'])
+def rebuildReviewStats():
+    try:
+        job_queue.enqueue("rebuild_review_stats")
+    except Exception as e:
+        logging.error(f"An error occurred while queueing the review statistics rebuild: {e}")
+    return redirect(url_for('routes.admin'))
+
+
 # delete movie from database
 @routes.route('/deleteMovie', methods=['POST'])
 def deleteMovie():
@@ -177,6 +213,46 @@ def update_movie_info():
     :return: redirect to admin page
     """
     if request.method == 'POST':
-        title = request.form['title'] or None
-        DBMS_Movie.update_movie_info(title=title)
+        title = request.form['title'].strip()
+        # An empty title can never succeed, don't queue a job that fails max_attempts times
+        if title:
+            job_queue.enqueue("update_movie_info", title=title)
+        else:
+            logging.error("No movie title provided")
     return redirect(url_for('routes.admin'))
+
+
+@routes.route('/admin/jobs', methods=['GET'])
+def admin_jobs():
+    """
+    Status of the most recent background jobs, optionally filtered with ?status=queued|running|done|failed
+    :return: JSON list of jobs
+    """
+    jobs = job_queue.list_jobs(status=request.args.get('status'), limit=request.args.get('limit', 50, type=int))
+    for job in jobs:
+        job['_id'] = str(job['_id'])
+    return jsonify(jobs)
+
+
+@routes.route('/admin/cache', methods=['GET'])
+def admin_cache():
+    """
+    Counters of the cached TMDB lookups (hits, negative hits, fetches, ...) and of the in-process caches
+    :return: JSON of the counters per MongoDB collection
+    """
+    return jsonify({
+        'metadata': DBMS_Movie.metadata_stats(),
+        'in_process': handler.cache.stats(),
+    })
+
+
+@routes.route('/admin/analytics', methods=['GET'])
+def admin_analytics():
+    """
+    Review analytics from MongoDB aggregation pipelines, per genre or for one movie with ?movie_id=
+    :return: JSON of the rating totals per genre, or the movie's average, count and distribution
+    """
+    movie_id = request.args.get('movie_id', type=int)
+    if movie_id is not None:
+        return jsonify(DBMS_Movie.movie_rating_summary(movie_id))
+    return jsonify(DBMS_Movie.genre_rating_totals())
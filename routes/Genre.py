@@ -23,7 +23,7 @@ def genre_page(genre: str, page: int) -> str:
     if genre is None:
         abort(404)
     limit = int(config.get("MOVIE", "LIMIT"))
-    pages = DBMS_Movie.get_genre_pages(genre=genre, limit=limit)
+    pages = DBMS_Movie.get_genre_pages(genre=genre, limit=limit, pages=page)
     pages_left = pages["pages_left"]
     total_pages = pages["total_pages"]
 
@@ -34,7 +34,8 @@ def genre_page(genre: str, page: int) -> str:
         abort(404)
         logging.error("Page is greater than total pages")
 
-    movie_list = DBMS_Movie.Genre(genre=genre, page=page, limit=limit)
+    after = DBMS_Movie.parse_page_cursor(request.args.get('after'))
+    movie_list, next_after = DBMS_Movie.genre_listing(genre=genre, page=page, limit=limit, after=after)
     carousel = DBMS_Movie.carousel()
     genres = DBMS_Movie.get_all_genres()
     kwargs = {'genre': genre}  # Additional keyword arguments for the URL
@@ -45,6 +46,7 @@ def genre_page(genre: str, page: int) -> str:
         movie_list=movie_list,
         total_pages=total_pages,
         pages_left=pages_left,
+        next_after=next_after,
         page=page,
         carousel=carousel,
         genre=genre,
@@ -1,4 +1,3 @@
-import concurrent.futures
 import logging
 
 from flask import render_template, abort, request
@@ -7,6 +6,8 @@ from flask_login import current_user
 import Database.DBMS_Movie as DBMS_Movie
 import Database.Mongo as Mongo
 from Config.ConfigManager import ConfigManager
+from Database.Cache import LRUCache, MISSING
+from Database.Executor import ExecutorService
 from . import routes
 
 DBMS_Movie = DBMS_Movie
@@ -18,6 +19,35 @@ handler = Mongo.MongoDBHandler.get_instance(
     config.get('MONGODB', 'DATABASE')
 )
 
+executor = ExecutorService()
+
+# Everything on the movie page except the watchlist toggle, keyed by (movie id, cast view) so every spelling of the
+# URL shares one entry and invalidation doesn't depend on how the page was opened
+movie_page_cache = LRUCache(
+    max_size=config.getint('MOVIE', 'PAGE_CACHE_SIZE', fallback=512),
+    ttl=config.getint('MOVIE', 'PAGE_CACHE_TTL', fallback=600)
+)
+
+
+def invalidate_movie_page(movie_id: int) -> None:
+    """
+    Drop the cached movie page, both the normal and the cast view
+    :param movie_id: Movie ID
+    :return: None
+    """
+    for cast in (False, True):
+        movie_page_cache.invalidate((int(movie_id), cast))
+
+
+@DBMS_Movie.on_catalog_change
+def _invalidate_movie_page(action: str, movie_id: int = None, title: str = None) -> None:
+    if movie_id is None and title:
+        movie_id = DBMS_Movie.check_movie(title)
+    if movie_id is not None:
+        invalidate_movie_page(movie_id)
+    elif action != "insert":
+        movie_page_cache.clear()
+
 
 @routes.route('/home/page/<int:page>', methods=['GET'])
 @routes.route('/home', defaults={'page': 1}, methods=['GET'])
@@ -43,13 +73,14 @@ def home(page: int) -> str:
         abort(404)
 
     carousel = DBMS_Movie.carousel()
-    movie_list = DBMS_Movie.Movie_list(page=page, limit=limit)
+    # The Next link carries the key of the last movie on this page, so the next page is one index seek
+    after = DBMS_Movie.parse_page_cursor(request.args.get('after'))
+    movie_list, next_after = DBMS_Movie.movie_listing(page=page, limit=limit, after=after)
     genres = DBMS_Movie.get_all_genres()
-    recommendations = []
     if current_user.is_authenticated:
-        recommendations = DBMS_Movie.movie_recommendation(current_user.id)
+        because_you_saved, recommendations = DBMS_Movie.movie_recommendation(current_user.id)
     else:
-        recommendations = DBMS_Movie.movie_recommendation()
+        because_you_saved, recommendations = DBMS_Movie.movie_recommendation()
     kwargs = {}
 
     return render_template(
@@ -58,7 +89,9 @@ def home(page: int) -> str:
         movie_list=movie_list,
         total_pages=total_pages,
         recommendations=recommendations,
+        because_you_saved=because_you_saved,
         pages_left=pages_left,
+        next_after=next_after,
         carousel=carousel,
         page=page,
         genre_list=genres,
@@ -66,6 +99,96 @@ def home(page: int) -> str:
     )
 
 
+def movie_page_context(movie_name: str, cast: bool) -> dict | None:
+    """
+    Build the template variables of a movie page that are the same for every user
+    :param movie_name: Movie name, without the (year)
+    :param cast: True for the full cast view, False for the top 3 actors
+    :return: Template variables, None if the movie is not found
+    """
+    movie = DBMS_Movie.movie_page(movie_name)
+
+    if movie == {} or movie is None:
+        return None
+
+    movie_details = movie.get('movie')
+    movie_genres = movie.get('genres')
+    movie_director = movie.get('director')
+    movie_link = movie.get('tmdb_link')
+    movie_actors = movie.get('actors')
+
+    # If no /cast
+    if not cast:
+        movie_actors = movie_actors[:3]
+
+    # Get profile image from MongoDB
+    actors = []
+    if movie_actors:
+        # Profiles not cached in MongoDB are fetched from TMDB
+        actor_profiles = executor.map(lambda actor: DBMS_Movie.get_actor_info(actor_tmdb_id=actor[1]),
+                                      movie_actors, upstream='tmdb')
+
+        for actor, actor_profile in zip(movie_actors, actor_profiles):
+            if actor_profile is not None:
+                profile_path = config.get("MOVIE", "TMDB_IMAGE_URL") + actor_profile.get('profile_path',
+                                                                                         '') if actor_profile.get(
+                    'profile_path') is not None else None
+                actors.append([actor[0], actor[1], actor[2], profile_path])
+
+    movie_tmdb_rating = round(movie.get('rating')[0] * 10) if movie.get('rating') else 0
+
+    # Delete left side of link
+    movie_tmdb_id = movie_link.split(config.get("MOVIE", "TMDB_MOVIE_URL"))[1]
+
+    movie_providers = DBMS_Movie.movie_providers(movie_tmdb_id)
+
+    providers = []
+    if movie_providers is not None:
+        for key, value in movie_providers.items():
+            # If key is not a link
+            if key != 'link':
+                for provider in value:
+                    # save as [[logo_path, provider_name, display_priority], ...]
+                    providers.append([
+                        config.get("MOVIE", "TMDB_IMAGE_URL") + provider['logo_path'],
+                        provider['provider_name'],
+                        provider['display_priority']
+                    ])
+
+        # sort providers based on 'display_priority', Casting display_priority to int and removing duplicates
+        providers = sorted(providers, key=lambda x: int(x[2]))
+        providers = [providers[i] for i in range(len(providers)) if i == 0 or providers[i] != providers[i - 1]]
+
+    else:
+        providers = None
+
+    # get movie reviews
+    movieID = DBMS_Movie.check_movie(movie_name.strip())
+    # json object containing all reviews for a movie
+    data = handler.find_documents(config.get('MONGODB', 'REVIEW_COLLECTION'), {'movie_id': movieID})
+    reviews = []
+    rating = 0
+    if data:
+        ratings = data[0].get('ratings', [])
+        comments = data[0].get('comments', [])
+        reviews = list(zip(ratings, comments))
+        # Averaged in MongoDB, reviews without a rating don't count
+        rating = round(DBMS_Movie.movie_rating_summary(movieID)['average'] / 5 * 100)
+
+    return {
+        'movie_id': movieID,
+        'movie': movie_details,
+        'genres': movie_genres,
+        'director': movie_director,
+        'actors': actors,
+        'providers': providers,
+        'link': movie_link,
+        'rating': rating,
+        'tmdb_rating': movie_tmdb_rating,
+        'reviews': reviews,
+    }
+
+
 @routes.route('/movie/<string:movie_name>/cast', methods=['GET'])
 @routes.route('/movie/<string:movie_name>', methods=['GET', 'POST'])
 def movie_page(movie_name: str = None):
@@ -80,99 +203,37 @@ def movie_page(movie_name: str = None):
 
     try:
         # Remove (year) from movie name
-        if movie_name is not None:
-            try:
-                movie_name, movie_year = movie_name.split('(')
-            except ValueError:
-                movie_year = None
-
-            movie = DBMS_Movie.movie_page(movie_name)
-
-            if movie == {} or movie is None:
-                logging.error(f'Movie not found: {movie_name}')
-                abort(404)  # Raise a 404 error if movie is not found
-
-            movie_details = movie.get('movie')
-            movie_genres = movie.get('genres')
-            movie_director = movie.get('director')
-            movie_link = movie.get('tmdb_link')
-            movie_actors = movie.get('actors')
-
-            # Movie year is none, get from movie details[1]
-            if movie_year is None:
-                if movie_details is not None and len(movie_details) > 1:
-                    movie_year = movie_details[1].split(' ')[-1]
-                else:
-                    movie_year = None
-                if movie_year:
-                    movie_year = movie_year + ')'
+        try:
+            movie_name, movie_year = movie_name.split('(')
+        except ValueError:
+            movie_year = None
 
-            # If no /cast
-            if request.path == f'/movie/{movie_name}({movie_year}/cast':
-                movie_actors = movie_actors
-            else:
-                movie_actors = movie_actors[:3]
-        else:
-            movie_details = None
-            movie_genres = None
-            movie_director = None
-            movie_link = None
-            movie_actors = None
-
-        # Get profile image from MongoDB
-        actors = []
-        if movie_actors:
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                actor_profiles = executor.map(lambda actor: DBMS_Movie.get_actor_info(actor_tmdb_id=actor[1]),
-                                              movie_actors)
-
-            for actor, actor_profile in zip(movie_actors, actor_profiles):
-                if actor_profile is not None:
-                    profile_path = config.get("MOVIE", "TMDB_IMAGE_URL") + actor_profile.get('profile_path',
-                                                                                             '') if actor_profile.get(
-                        'profile_path') is not None else None
-                    actors.append([actor[0], actor[1], actor[2], profile_path])
-
-        movie_tmdb_rating = round(movie.get('rating')[0] * 10) if movie.get('rating') else 0
-
-        # Delete left side of link
-        movie_tmdb_id = movie_link.split(config.get("MOVIE", "TMDB_MOVIE_URL"))[1]
-
-        movie_providers = DBMS_Movie.movie_providers(movie_tmdb_id)
-
-        providers = []
-        if movie_providers is not None:
-            for key, value in movie_providers.items():
-                # If key is not a link
-                if key != 'link':
-                    for provider in value:
-                        # save as [[logo_path, provider_name, display_priority], ...]
-                        providers.append([
-                            config.get("MOVIE", "TMDB_IMAGE_URL") + provider['logo_path'],
-                            provider['provider_name'],
-                            provider['display_priority']
-                        ])
-
-            # sort providers based on 'display_priority', Casting display_priority to int and removing duplicates
-            providers = sorted(providers, key=lambda x: int(x[2]))
-            providers = [providers[i] for i in range(len(providers)) if i == 0 or providers[i] != providers[i - 1]]
-
-        else:
-            providers = None
-
-        # get movie reviews
-        movieID = DBMS_Movie.check_movie(movie_name.strip())
-        # json object containing all reviews for a movie
-        data = handler.find_documents(config.get('MONGODB', 'REVIEW_COLLECTION'), {'movie_id': movieID})
-        reviews = []
-        rating = 0
-        if data:
-            ratings = data[0].get('ratings', [])
-            comments = data[0].get('comments', [])
-            reviews = list(zip(ratings, comments))
-            numRating = len(ratings)
-            rating = sum(int(rating) for rating in ratings) / numRating if numRating != 0 else 0
-            rating = round(rating / 5 * 100)
+        movie_id = DBMS_Movie.check_movie(movie_name.strip())
+        if movie_id is None:
+            logging.error(f'Movie not found: {movie_name}')
+            abort(404)  # Raise a 404 error if movie is not found
+
+        # Everything but the watchlist is the same for every user, build it once per movie and view
+        cache_key = (movie_id, request.path.endswith('/cast'))
+        context = movie_page_cache.get(cache_key)
+        if context is MISSING:
+            context = movie_page_context(movie_name, cache_key[1])
+            if context is not None:
+                movie_page_cache.set(cache_key, context)
+
+        if context is None:
+            logging.error(f'Movie not found: {movie_name}')
+            abort(404)  # Raise a 404 error if movie is not found
+
+        movie_details = context['movie']
+        movieID = context['movie_id']
+
+        # Movie year is none, get from movie details[1]
+        if movie_year is None:
+            if movie_details is not None and len(movie_details) > 1:
+                movie_year = movie_details[1].split(' ')[-1]
+            if movie_year:
+                movie_year = movie_year + ')'
 
         inWatchList = False
         # Error handling just in case
@@ -196,10 +257,12 @@ def movie_page(movie_name: str = None):
                 if inWatchList:
                     handler.update_document(config.get('MONGODB', 'WATCHLIST_COLLECTION'), {'user_id': current_user.id},
                                             {'watchlist_arr': movieID}, '$pull')
+                    DBMS_Movie.watchlist_changed(current_user.id, movieID, added=False)
                     inWatchList = False
                 else:
                     handler.update_document(config.get('MONGODB', 'WATCHLIST_COLLECTION'), {'user_id': current_user.id},
                                             {'watchlist_arr': movieID}, '$push')
+                    DBMS_Movie.watchlist_changed(current_user.id, movieID, added=True)
                     inWatchList = True
 
         return render_template(
@@ -207,14 +270,14 @@ def movie_page(movie_name: str = None):
             movie_name=movie_name,
             movie_year=movie_year,
             movie=movie_details,
-            genres=movie_genres,
-            director=movie_director,
-            actors=actors,
-            providers=providers,
-            link=movie_link,
-            rating=rating,
-            tmdb_rating=movie_tmdb_rating,
-            reviews=reviews,
+            genres=context['genres'],
+            director=context['director'],
+            actors=context['actors'],
+            providers=context['providers'],
+            link=context['link'],
+            rating=context['rating'],
+            tmdb_rating=context['tmdb_rating'],
+            reviews=context['reviews'],
             inWatchList=inWatchList
         )
     except (ValueError, KeyError, TypeError) as e:
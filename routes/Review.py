@@ -6,6 +6,7 @@ import Database.DBMS_Movie as DBMS_Movie
 from Config.ConfigManager import ConfigManager
 from Database import Mongo
 from . import routes
+from .Movie import invalidate_movie_page
 
 DBMS_Movie = DBMS_Movie
 config_manager = ConfigManager()
@@ -39,5 +40,10 @@ def review():
             'ratings': rating,
             'comments': comments,
         }, '$push')
+    # Dashboard statistics are updated here instead of being recomputed from every review
+    DBMS_Movie.record_rating(movieID, rating)
+    # The cached movie page has the old reviews and rating
+    if movieID is not None:
+        invalidate_movie_page(movieID)
     # return to home page
     return redirect(url_for('routes.movie_page', movie_name=movieName))
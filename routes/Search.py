@@ -1,9 +1,9 @@
-from flask import render_template, request, abort
+from flask import render_template, request, abort, jsonify, url_for
 from . import routes
 import Database.DBMS_Movie as DBMS_Movie
 from Config.ConfigManager import ConfigManager
 import Database.User as DBUser
-from Database import Mongo
+from Database import Mongo, GlobalSearch
 import logging
 
 DBMS_Movie = DBMS_Movie
@@ -16,37 +16,39 @@ handler = Mongo.MongoDBHandler.get_instance(
 )
 
 def load_stats():
-    #get statistics
+    #get statistics, maintained as reviews are written (see DBMS_Movie.ReviewStats)
     data = {'Genre' : 'Popularity Score'}
-    #get total popularity of all movies
-    allRating = handler.find_documents(config.get('MONGODB', 'REVIEW_COLLECTION'), {}, 0)
-    for rating in allRating:
-        totalScore = 0
-        for score in rating['ratings']:
-            #add all scores together
-            totalScore += int(score)
-        #if genre already exists, add to it
-        if DBMS_Movie.get_genre_name(DBMS_Movie.get_genre(rating['movie_id'])) in data:
-            data[DBMS_Movie.get_genre_name(DBMS_Movie.get_genre(rating['movie_id']))] += int(totalScore)
-        #else create new genre
-        else:
-            data[DBMS_Movie.get_genre_name(DBMS_Movie.get_genre(rating['movie_id']))] = int(totalScore)
-        logging.info(data)
+    data.update(DBMS_Movie.genre_totals())
     return data
 
 @routes.route('/search', methods=['POST'])
 def search():
     query = request.form['search'].strip()
     if query:
-        director_results = DBMS_Movie.search_directors(query)
-        actor_results = DBMS_Movie.search_actors(query)
-        movie_results = DBMS_Movie.search_movies(query)
-        profile_results = dbUser.search_user(query)
-        return render_template('search.html', directors=director_results, actors=actor_results, movies=movie_results, profiles=profile_results)
+        results = GlobalSearch.search_all(query)
+        return render_template('search.html', directors=results['directors'], actors=results['actors'], movies=results['movies'], profiles=results['profiles'])
     else:
         abort(404)
         logging.error("No search input provided")
 
+@routes.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    """
+    Typeahead suggestions for the search bar
+    :return: JSON list of suggestions {type, name, id, tmdb_id, url}
+    """
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 10, type=int), 25))
+    suggestions = DBMS_Movie.suggest(query, limit) if query else []
+    for suggestion in suggestions:
+        if suggestion['type'] == 'movie':
+            suggestion['url'] = url_for('routes.movie_page', movie_name=suggestion['name'])
+        elif suggestion['type'] == 'actor':
+            suggestion['url'] = url_for('routes.actor', tmdb_id=suggestion['tmdb_id'])
+        else:
+            suggestion['url'] = url_for('routes.director_page', tmdb_id=suggestion['tmdb_id'])
+    return jsonify(suggestions)
+
 @routes.route('/searchMovie', methods=['POST'])
 def search_query():
     query = request.form['search'].strip()
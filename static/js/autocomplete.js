@@ -0,0 +1,45 @@
+// Typeahead for the search bar, suggestions come from /autocomplete
+(function () {
+    var input = document.getElementById("search");
+    var list = document.getElementById("search-suggestions");
+    if (!input || !list) {
+        return;
+    }
+
+    var timer = null;
+    var latest = 0;
+
+    input.addEventListener("input", function () {
+        clearTimeout(timer);
+        var query = input.value.trim();
+        if (!query) {
+            list.innerHTML = "";
+            return;
+        }
+
+        // Wait for a short pause in typing before asking the server
+        timer = setTimeout(function () {
+            var request = ++latest;
+            fetch("/autocomplete?q=" + encodeURIComponent(query))
+                .then(function (response) {
+                    return response.json();
+                })
+                .then(function (suggestions) {
+                    // Drop responses to older keystrokes
+                    if (request !== latest) {
+                        return;
+                    }
+                    list.innerHTML = "";
+                    suggestions.forEach(function (suggestion) {
+                        var option = document.createElement("option");
+                        option.value = suggestion.name;
+                        option.label = suggestion.type + (suggestion.year ? " (" + suggestion.year + ")" : "");
+                        list.appendChild(option);
+                    });
+                })
+                .catch(function () {
+                    list.innerHTML = "";
+                });
+        }, 150);
+    });
+})();